@@ -0,0 +1,131 @@
+from answers import discard_answer
+from background import background
+from client import get_client
+from collections import deque
+from events import game_events
+from metrics import metrics
+from queries import query_cache
+from store import game_store
+from temporalio.service import RPCError, RPCStatusCode
+from typing import Deque, Dict, Optional, Tuple
+from workflow import AnswerSignal
+import asyncio
+import os
+import random
+import threading
+import time
+
+
+class AnswerQueue:
+    """Delivers answer signals in the background after the browser was answered.
+
+    Answers are queued per game and player and sent by one task per player,
+    strictly in the order they were accepted, so a player's answers can't
+    overtake each other while different players' answers go out in
+    parallel. At most ``concurrency`` signals are in flight across all
+    games. Transient failures are retried with backoff for up to
+    ``deadline`` seconds, holding back the rest of that player's queue
+    meanwhile. An answer that can't be delivered is taken back out of the
+    game's tally and listed as unsent there, unless the player has answered
+    the question again since.
+    """
+
+    def __init__(
+        self,
+        concurrency: int = 32,
+        deadline: float = 30.0,
+        initial_backoff: float = 0.1,
+        max_backoff: float = 2.0,
+    ) -> None:
+        self.concurrency = concurrency
+        self.deadline = deadline
+        self.initial_backoff = initial_backoff
+        self.max_backoff = max_backoff
+
+        self._lock = threading.Lock()
+        # (game id, player) -> answers not yet signalled, oldest first.
+        self._queues: Dict[Tuple[str, str], Deque[Tuple[AnswerSignal, float]]] = {}
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._idle = threading.Condition(self._lock)
+
+    def submit(self, game_id: str, answer: AnswerSignal) -> None:
+        key = (game_id, answer.player)
+        with self._lock:
+            queue = self._queues.get(key)
+            if queue is None:
+                queue = self._queues[key] = deque()
+                background.submit(self._drain(key, queue))
+            queue.append((answer, time.perf_counter()))
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "games": len({game_id for game_id, _ in self._queues}),
+                "queued": sum(len(q) for q in self._queues.values()),
+            }
+
+    def flush(self, timeout: float) -> bool:
+        """Wait until every queued answer was sent, e.g. before shutting down."""
+        with self._idle:
+            return self._idle.wait_for(lambda: not self._queues, timeout)
+
+    async def _drain(self, key: Tuple[str, str], queue: Deque[Tuple[AnswerSignal, float]]) -> None:
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.concurrency)
+        game_id = key[0]
+        workflow_id = f'trivia-game-{game_id}'
+        while True:
+            with self._lock:
+                if not queue:
+                    # Done with this player, a later answer starts a new task.
+                    del self._queues[key]
+                    self._idle.notify_all()
+                    return
+                answer, queued_at = queue[0]
+
+            outcome = await self._send(workflow_id, answer)
+            metrics.inc("trivia_answer_signals_total", outcome=outcome)
+            metrics.observe("trivia_answer_signal_seconds", time.perf_counter() - queued_at)
+            with self._lock:
+                queue.popleft()
+                superseded = any(later.question == answer.question for later, _ in queue)
+            if outcome == "sent":
+                query_cache.invalidate(workflow_id)
+            elif not superseded:
+                # The browser was told it's in, the results page tells otherwise.
+                await game_store.update_async(game_id, lambda g: discard_answer(g, answer.question, answer.player, answer.answer))
+            game_events.poke(game_id)
+
+    async def _send(self, workflow_id: str, answer: AnswerSignal) -> str:
+        stop_at = time.monotonic() + self.deadline
+        backoff = self.initial_backoff
+        attempt = 0
+        while True:
+            attempt += 1
+            try:
+                async with self._semaphore:
+                    client = await get_client()
+                    await client.get_workflow_handle(workflow_id).signal("answer-signal", answer)
+                return "sent"
+            except RPCError as e:
+                if e.status == RPCStatusCode.NOT_FOUND:
+                    print(f"Dropping answer of {answer.player} to question {answer.question}, {workflow_id} is gone")
+                    return "not_found"
+                error: Exception = e
+            except Exception as e:
+                error = e
+
+            delay = random.uniform(0, backoff)
+            if time.monotonic() + delay > stop_at:
+                print(f"Gave up sending answer of {answer.player} to question {answer.question} on {workflow_id} after {attempt} attempts: {error}")
+                return "failed"
+            metrics.inc("trivia_answer_signal_retries_total")
+            await asyncio.sleep(delay)
+            backoff = min(backoff * 2, self.max_backoff)
+
+
+metrics.counter("trivia_answer_signals_total", "Answer signals by outcome (sent, not_found, failed).")
+metrics.counter("trivia_answer_signal_retries_total", "Answer signal attempts that were retried.")
+metrics.histogram("trivia_answer_signal_seconds", "Time from accepting an answer to the workflow receiving it.")
+
+answer_queue = AnswerQueue(concurrency=int(os.getenv("ANSWER_SIGNAL_CONCURRENCY", "32")))
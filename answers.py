@@ -0,0 +1,77 @@
+"""Per-question answer tallies, updated as answers arrive.
+
+Everything lives in the game dict so it's updated atomically with
+``game_store.update``:
+
+    game["tallies"]["3"] = {
+        "answers": {"alice": "B", ...},     # each player's latest choice
+        "choices": {"B": ["alice", ...]},  # who picked what, in answer order
+        "correct": 1,                      # players with the right answer
+        "fastest": ["alice", ...],         # correct players, fastest first
+        "unsent": ["bob", ...],            # answers that never reached the workflow
+    }
+
+A player who answers again moves from their old choice to the new one, so
+resubmits never count twice. An answer the workflow never received is taken
+back out with ``discard_answer``. Scores are the workflow's own, see
+``leaders``.
+"""
+from typing import List, Optional, Tuple
+
+LEADERS = 5
+
+
+def _empty_tally() -> dict:
+    return {"answers": {}, "choices": {}, "correct": 0, "fastest": []}
+
+
+def record_answer(game: dict, number: int, answer: str, player: str, choice: str) -> None:
+    """Count ``player``'s ``choice`` for question ``number`` whose right answer is ``answer``."""
+    tally = game.setdefault("tallies", {}).setdefault(str(number), _empty_tally())
+
+    if player in tally.get("unsent", ()):
+        # A new answer gets its own chance to reach the workflow.
+        tally["unsent"].remove(player)
+    previous: Optional[str] = tally["answers"].get(player)
+    if previous == choice:
+        return
+    if previous is not None:
+        tally["choices"][previous].remove(player)
+        if previous == answer:
+            tally["correct"] -= 1
+            tally["fastest"].remove(player)
+
+    tally["answers"][player] = choice
+    tally["choices"].setdefault(choice, []).append(player)
+    if choice == answer:
+        tally["correct"] += 1
+        tally["fastest"].append(player)
+
+
+def discard_answer(game: dict, number: int, player: str, choice: str) -> None:
+    """Take back ``player``'s ``choice`` for question ``number``, it was never signalled.
+
+    Nothing changes if the player has answered differently since, that
+    answer is the one the workflow gets.
+    """
+    tally = game.get("tallies", {}).get(str(number))
+    if tally is None or tally["answers"].get(player, "").upper() != choice.upper():
+        return
+    previous = tally["answers"].pop(player)
+    tally["choices"][previous].remove(player)
+    if player in tally["fastest"]:
+        tally["correct"] -= 1
+        tally["fastest"].remove(player)
+    tally.setdefault("unsent", []).append(player)
+
+
+def question_tally(game: dict, number: int) -> dict:
+    return game.get("tallies", {}).get(str(number)) or _empty_tally()
+
+
+def leaders(players) -> List[Tuple[str, int]]:
+    """The top LEADERS of ``getPlayers`` by the workflow's score, as the end page shows them."""
+    if not isinstance(players, dict):
+        return []
+    scores = [(player, value.get("score") or 0) for player, value in players.items()]
+    return sorted(scores, key=lambda item: -item[1])[:LEADERS]
@@ -1,26 +1,110 @@
-from flask import Flask, render_template, request, redirect, url_for, session, jsonify
+from startup import startup_profile
+# First, so PROFILE_STARTUP=1 times every import below.
+startup_profile.begin()
+
+from flask import Flask, Response, render_template, request, redirect, url_for, session, jsonify
+import asyncio
+import functools
 import os
+import signal
+import time
 import uuid
-from client import get_client
+from answer_queue import answer_queue
+from answers import leaders, question_tally, record_answer
+from assets import assets
+from background import background
+from cname import temporal_cname
+from client import get_client, pool
+from directory import game_directory
+from events import LONG_POLL_TIMEOUT, game_events
+from eviction import game_evictor
+from metrics import instrument, metrics, profiler
+from qr import qr_codes
+from queries import GameNotFound, GameUnavailable, query_cache, query_state, query_workflow
+from questions import question_cache
+from registry import game_registry
+from rendering import conditional, json_encode, json_response, rendering
+from store import game_store
 from temporalio.client import WorkflowFailureError
-from workflow import TriviaWorkflowInput, GamesWorkflowInput, PlayerWorkflowInput, StartGameSignal, AnswerSignal
-import qrcode
-import qrcode.image.svg
+from temporalio.exceptions import WorkflowAlreadyStartedError
+from workflow import TriviaWorkflowInput, PlayerWorkflowInput, StartGameSignal, AnswerSignal
 import re
-from typing import List, Dict
-import dns.resolver
-from urllib.parse import urlparse
 
-app = Flask(__name__)
+class TriviaFlask(Flask):
+    def async_to_sync(self, func):
+        # Run async views on the worker's shared background loop instead of a
+        # new event loop per request, so concurrent requests overlap their
+        # Temporal calls on the pooled client.
+        @functools.wraps(func)
+        def run(*args, **kwargs):
+            return background.submit(func(*args, **kwargs)).result()
+        return run
+
+app = TriviaFlask(__name__)
 app.secret_key = 'SA_R0ck5!'
-
-games = {}
-
-
-qr_directory = "static/qr"
-
-# Create directory if it doesn't exist
-os.makedirs(qr_directory, exist_ok=True)
+instrument(app)
+assets.init_app(app)
+rendering.init_app(app, assets.version())
+pool.warm()
+game_registry.start()
+game_evictor.start()
+
+@metrics.collector
+def runtime_metrics():
+    connections = pool.stats()
+    yield "trivia_temporal_connects_total", "counter", "Temporal client connects.", {}, connections["connects"]
+    yield "trivia_temporal_connect_failures_total", "counter", "Failed Temporal client connect attempts.", {}, connections["connect_failures"]
+    yield "trivia_temporal_connect_seconds_total", "counter", "Time spent connecting to Temporal.", {}, connections["connect_seconds_total"]
+    cache = query_cache.stats()
+    for result in ("hits", "misses", "coalesced"):
+        yield "trivia_query_cache_total", "counter", "Query cache lookups by result.", {"result": result}, cache[result]
+    yield "trivia_query_cache_entries", "gauge", "Cached query results.", {}, cache["entries"]
+    streams = game_events.stats()
+    yield "trivia_game_watchers", "gauge", "Games being watched for event streams.", {}, streams["watchers"]
+    yield "trivia_event_streams", "gauge", "Open event streams.", {}, streams["subscribers"]
+    answers = answer_queue.stats()
+    yield "trivia_answer_queue_depth", "gauge", "Answers waiting to be signalled.", {}, answers["queued"]
+    yield "trivia_answer_queue_games", "gauge", "Games with answers waiting to be signalled.", {}, answers["games"]
+    held = game_evictor.stats()
+    yield "trivia_games_held", "gauge", "Games in the game store at the last sweep.", {}, held["games"]
+    yield "trivia_game_state_bytes", "gauge", "Serialized size of all games at the last sweep.", {}, held["bytes"]
+    yield "trivia_games_evicted_total", "counter", "Games dropped by the store for being idle or over its limits.", {}, held["evicted"]
+    yield "trivia_request_profiling", "gauge", "1 while per-request profiling is on.", {}, int(profiler.enabled)
+
+async def load_game(game_id):
+    game = await game_store.get_async(game_id)
+    if game is None:
+        # Evicted while idle, or never here; rebuilt from the workflow if any.
+        game = await game_evictor.restore(game_id)
+    return game
+
+async def update_game(game_id, fn):
+    game = await game_store.update_async(game_id, fn)
+    if game is None:
+        await load_game(game_id)
+        game = await game_store.update_async(game_id, fn)
+        if game is None:
+            raise GameNotFound(f"Game {game_id} not found")
+    return game
+
+@app.errorhandler(GameNotFound)
+def game_not_found(e):
+    return error_response(str(e), 404)
+
+@app.errorhandler(GameUnavailable)
+def game_unavailable(e):
+    response = error_response(str(e), 503)
+    response.headers["Retry-After"] = "2"
+    return response
+
+def error_response(message, status):
+    # Pollers (fetch/$.get send */*) get JSON, browsers navigating get a page.
+    if request.accept_mimetypes.best_match(["application/json", "text/html"]) == "application/json":
+        response = jsonify(error=message)
+    else:
+        response = app.make_response(render_template('error.html', error=message))
+    response.status_code = status
+    return response
 
 @app.route('/')
 async def home(): 
@@ -29,83 +113,10 @@ async def home():
 @app.route('/game')
 async def game():
 
-    client = await get_client()
-    try:
-        trivia_workflow = client.get_workflow_handle(workflow_id="trivia-game")
-        desc = await trivia_workflow.describe()
-        if (desc.status != 1):
-            print("Trivia game state workflow does is not running, starting...")
-            
-            await client.start_workflow(
-                "TriviaGamesWorkflow",
-                id=f'trivia-game',
-                task_queue=os.getenv("TEMPORAL_TASK_QUEUE"),
-            )                
-    except:
-        print("Trivia game state workflow does not exist, starting...")
-        
-        await client.start_workflow(
-            "TriviaGamesWorkflow",
-            id=f'trivia-game',
-            task_queue=os.getenv("TEMPORAL_TASK_QUEUE"),
-        )        
-    
-    game_status: List[Dict] = []
-    is_query_games = False
-    while not is_query_games:
-        try:
-            game_status = await trivia_workflow.query("getGames")
-            is_query_games = True 
-        except:
-            pass
-
-    for game_id in game_status:
-        game_id = None
-    
-        trivia_workflow = client.get_workflow_handle(f'trivia-game-{game_id}')
-
-        # Try to get players, if we aren't successful skip workflow as something is likely wrong with it.
-        players: List[Dict] = []
-        for _ in range(3):
-            try:
-                players = await trivia_workflow.query("getPlayers")
-                if players:
-                    break
-            except:
-                pass
-        else:
-            continue
-
-        player_names = []
-        if game_id not in games:
-            games[game_id] = {}
-            games[game_id]["users"] = {}
-        for p in players:
-            player_names.append(p)   
-        
-        progress: List[Dict] = []
-        while not progress:
-            try:
-                progress = await trivia_workflow.query("getProgress")             
-            except:
-                pass
-
-        if progress["stage"] != "start":
-            games[game_id]["started"] = True                 
-
-        games[game_id]["users"] = player_names               
-
-    # cleanup games where workflow was deleted due to storage tiering
-    for game_id in list(games.keys()):
-        if game_id not in game_status:
-            del games[game_id]
-
-    return render_template('index.html', games=games)
+    await game_registry.ensure()
+    listing = await game_directory.get()
 
-def create_qr_code(game_id):
-    img = qrcode.make(f'https://trivia.tmprl-demo.cloud/{game_id}/join')
-    with open(f'static/qr/qr-{game_id}.gif', 'wb') as qr:
-        img.save(qr)
+    return render_template('index.html', games=listing)
 
 @app.route('/create_game', methods=['GET', 'POST'])
 async def create_game():
@@ -133,122 +144,187 @@ async def create_game():
         if category == 'random':
             category = ""    
 
+        game = {
+            "users": [],
+            "number_players": number_players,
+            "started": False,
+            "answer_limit": answer_limit,
+            "created_at": time.time(),
+            "joining": {},
+            "rejected": {},
+        }
         game_id = str(uuid.uuid4().int)[:6] 
-        games[game_id] = {"users": [], "answers": []}
-        games[game_id]["number_players"] = number_players
-        games[game_id]["started"] = False
-        games[game_id]["answer_limit"] = answer_limit
+        while not await game_store.create_async(game_id, game):
+            game_id = str(uuid.uuid4().int)[:6]
         
         client = await get_client()
 
-        # Start game state workflow if not started
-        try:
-            # Attempt to describe the workflow
-            handle = client.get_workflow_handle(workflow_id="trivia-game")
-            desc = await handle.describe()
-
-            if desc.status.name in ["COMPLETED", "FAILED", "CANCELED", "TIMED_OUT", "TERMINATED"]:
-                print("Trivia game state workflow does is not running, starting...")
-                
-                await client.start_workflow(
-                    "TriviaGamesWorkflow",
-                    id=f'trivia-game',
-                    task_queue=os.getenv("TEMPORAL_TASK_QUEUE"),
-                )
-
-        except Exception as e:
-            print("Trivia game state workflow does not exist, starting...")
-            
-            await client.start_workflow(
-                "TriviaGamesWorkflow",
-                id=f'trivia-game',
-                task_queue=os.getenv("TEMPORAL_TASK_QUEUE"),
-            )                       
-
-        trivia_game_input = TriviaWorkflowInput(
-            GameId=game_id,
-            Category=category,
-            NumberOfPlayers=number_players,
-            NumberOfQuestions=number_questions,
-            AnswerTimeLimit=answer_limit,
-            StartTimeLimit=300,
-            ResultTimeLimit=10,
-        )               
-
-        await client.start_workflow(
-            "TriviaGameWorkflow",
-            trivia_game_input,
-            id=f'trivia-game-{game_id}',
-            task_queue=os.getenv("TEMPORAL_TASK_QUEUE"),
-        )
-
-        create_qr_code(game_id)
+        await game_registry.ensure()
 
-        player_input = PlayerWorkflowInput(
-            GameWorkflowId=f'trivia-game-{game_id}',
-            Player=player,
-            NumberOfPlayers=number_players,
-        )  
+        try:
+            trivia_game_input = TriviaWorkflowInput(
+                GameId=game_id,
+                Category=category,
+                NumberOfPlayers=number_players,
+                NumberOfQuestions=number_questions,
+                AnswerTimeLimit=answer_limit,
+                StartTimeLimit=300,
+                ResultTimeLimit=10,
+            )
+        except ValueError as e:
+            await game_store.delete_async(game_id)
+            return render_template('create.html', error=str(e))
 
         try:
-            await client.execute_workflow(
-                "AddPlayerWorkflow",
-                player_input,
-                id=f'player-{player}-{game_id}',
+            trivia_workflow = await client.start_workflow(
+                "TriviaGameWorkflow",
+                trivia_game_input,
+                id=f'trivia-game-{game_id}',
                 task_queue=os.getenv("TEMPORAL_TASK_QUEUE"),
             )
-        except WorkflowFailureError as e:
-            return render_template('create.html', error=e.cause)
-            
+        except BaseException:
+            await game_store.delete_async(game_id)
+            raise
+        query_cache.invalidate('trivia-game')
 
-        trivia_workflow = client.get_workflow_handle(f'trivia-game-{game_id}')
-        players: List[Dict] = []
-        while not players:
-            try:
-                players = await trivia_workflow.query("getPlayers")
-            except:
-                pass
-
-        player_names = []
-        if game_id not in games:
-            games[game_id]["users"] = {}
-        for p in players:
-            player_names.append(p)          
-        games[game_id]["users"] = player_names
+        try:
+            error = await begin_join(client, game_id, player, number_players)
+        except BaseException:
+            await abandon_game(trivia_workflow, game_id)
+            raise
+        if error:
+            await abandon_game(trivia_workflow, game_id)
+            return render_template('create.html', error=error)
 
         session['username'] = player
-
-        if len(games[game_id]["users"]) >= games[game_id]["number_players"]:
-            return redirect(url_for('start', game_id=game_id))
-        else:
-            return redirect(url_for('lobby', game_id=game_id, number_players=games[game_id]["number_players"]))
+        return redirect(url_for('lobby', game_id=game_id, number_players=number_players))
     else:
         return render_template('create.html')        
 
+async def abandon_game(trivia_workflow, game_id):
+    """Undo a game its creator couldn't join: nobody else can find it."""
+    try:
+        await trivia_workflow.terminate(reason="The game's creator could not join")
+    except Exception as e:
+        print(f"Failed to terminate abandoned game {game_id}: {e}")
+    await game_store.delete_async(game_id)
+    query_cache.invalidate(trivia_workflow.id)
+    query_cache.invalidate('trivia-game')
+
 @app.route('/<game_id>/start')
 async def start(game_id):
     client = await get_client()
 
-    if not games[game_id]["started"] == True:
+    # Only the first player to get here starts the game, even across workers.
+    claimed = False
+    def claim(game):
+        nonlocal claimed
+        claimed = not game["started"]
+        game["started"] = True
+
+    await update_game(game_id, claim)
+
+    if claimed:
         StartGameSignalInput = StartGameSignal(
             action="StartGame"
         )    
 
         trivia_workflow = client.get_workflow_handle(f'trivia-game-{game_id}')
-        await trivia_workflow.signal("start-game-signal", StartGameSignalInput)
-        progress: List[Dict] = []
-        while not progress:
-            try:
-                progress = await trivia_workflow.query("getProgress")
-            except:
-                pass
+        try:
+            await trivia_workflow.signal("start-game-signal", StartGameSignalInput)
+        except Exception:
+            await game_store.update_async(game_id, lambda g: g.update(started=False))
+            raise
+        query_cache.invalidate(trivia_workflow.id)
+        game_events.poke(game_id)
+        progress = await query_workflow(trivia_workflow, "getProgress")
+
+        await game_store.update_async(game_id, lambda g: g.update(
+            number_questions=int(progress["numberOfQuestions"]),
+            question_number="1",
+        ))
 
+    return render_template('start.html', game_id=game_id)
 
-        games[game_id]["number_questions"] = int(progress["numberOfQuestions"])
-        games[game_id]["question_number"] = "1"
-        games[game_id]["started"] = True
+# A join whose outcome never arrived (e.g. the worker restarted) stops
+# blocking the name after this many seconds.
+JOIN_TIMEOUT = 60
 
-    return render_template('start.html', game_id=game_id)
+async def begin_join(client, game_id, player, number_players):
+    """Start adding a player to a game without waiting for the outcome.
+
+    Returns an error message if the player can't join. Otherwise the name is
+    reserved in the game store until AddPlayerWorkflow finishes, and the
+    lobby learns whether it was accepted through the game's event stream.
+    """
+    trivia_workflow = client.get_workflow_handle(f'trivia-game-{game_id}')
+    players = await query_workflow(trivia_workflow, "getPlayers", allow_empty=True)
+    if player in players:
+        return f'Player {player} already joined this game.'
+
+    reserved = False
+    def reserve(game):
+        nonlocal reserved
+        joining = game.setdefault("joining", {})
+        started = joining.get(player)
+        reserved = player not in game["users"] and (started is None or time.time() - started > JOIN_TIMEOUT)
+        if reserved:
+            joining[player] = time.time()
+            game.setdefault("rejected", {}).pop(player, None)
+
+    await update_game(game_id, reserve)
+    if not reserved:
+        return f'Player {player} already joined this game.'
+
+    player_input = PlayerWorkflowInput(
+        GameWorkflowId=f'trivia-game-{game_id}',
+        Player=player,
+        NumberOfPlayers=number_players,
+    )
+    try:
+        handle = await client.start_workflow(
+            "AddPlayerWorkflow",
+            player_input,
+            id=f'player-{player}-{game_id}',
+            task_queue=os.getenv("TEMPORAL_TASK_QUEUE"),
+        )
+    except BaseException as e:
+        await game_store.update_async(game_id, lambda g: g["joining"].pop(player, None))
+        if isinstance(e, WorkflowAlreadyStartedError):
+            return f'Player {player} is already joining this game.'
+        raise
+
+    background.submit(finish_join(handle, trivia_workflow, game_id, player))
+    game_events.poke(game_id)
+    return None
+
+async def finish_join(handle, trivia_workflow, game_id, player):
+    error = None
+    try:
+        await handle.result()
+    except WorkflowFailureError as e:
+        error = str(e.cause)
+    except Exception as e:
+        print(f"Failed to add player {player} to game {game_id}: {e}")
+        error = 'Could not join the game, please try again.'
+
+    players = None
+    if error is None:
+        query_cache.invalidate(trivia_workflow.id)
+        try:
+            players = list(await query_workflow(trivia_workflow, "getPlayers"))
+        except Exception as e:
+            print(f"Failed to refresh players of game {game_id}: {e}")
+
+    def settle(game):
+        game.setdefault("joining", {}).pop(player, None)
+        if error is not None:
+            game.setdefault("rejected", {})[player] = error
+        elif players is not None:
+            game["users"] = players
+
+    await game_store.update_async(game_id, settle)
+    game_events.poke(game_id)
 
 @app.route('/<game_id>/join', methods=['GET', 'POST'])
 async def join(game_id):
@@ -257,169 +333,185 @@ async def join(game_id):
         if not re.match('^[a-zA-Z0-9]+$', player):
             return render_template('join.html', game_id=game_id, error='Player can only contain letters and numbers without spaces.')        
 
-        player_input = PlayerWorkflowInput(
-            GameWorkflowId=f'trivia-game-{game_id}',
-            Player=player,
-            NumberOfPlayers=games[game_id]["number_players"],
-        )  
-
+        game = await load_game(game_id)
         client = await get_client()
 
-        player_result = ""
-        try:
-            player_result = await client.execute_workflow(
-            "AddPlayerWorkflow",
-            player_input,
-            id=f'player-{player}-{game_id}',
-            task_queue=os.getenv("TEMPORAL_TASK_QUEUE"),
-            )
-            print(player_result)
-        except WorkflowFailureError as e:
-            return render_template('join.html', game_id=game_id, error=e.cause)
-        
-        trivia_workflow = client.get_workflow_handle(f'trivia-game-{game_id}')
-        players: List[Dict] = []
-        while not players:
-            try:
-                players = await trivia_workflow.query("getPlayers")
-            except:
-                pass
-
-        player_names = []
-        if game_id not in games:
-            games[game_id]["users"] = {}
-        for p in players:
-            player_names.append(p)          
-        games[game_id]["users"] = player_names
+        error = await begin_join(client, game_id, player, game["number_players"])
+        if error:
+            return render_template('join.html', game_id=game_id, error=error)
 
         session['username'] = player
- 
-        if len(games[game_id]["users"]) >= games[game_id]["number_players"]:
-            return redirect(url_for('start', game_id=game_id))
-        else:
-            return redirect(url_for('lobby', game_id=game_id, number_players=games[game_id]["number_players"]))
+        return redirect(url_for('lobby', game_id=game_id, number_players=game["number_players"]))
     else:
         return render_template('join.html', game_id=game_id)
 
 @app.route('/<game_id>/lobby')
-def lobby(game_id):    
-    return render_template('lobby.html', users=games[game_id]["users"], game_id=game_id, number_players=games[game_id]["number_players"])
+async def lobby(game_id):    
+    game = await load_game(game_id)
+    player = session.get('username')
+    return rendering.page(
+        'lobby.html',
+        (game_id, tuple(game["users"]), game["number_players"], player),
+        users=game["users"], game_id=game_id, number_players=game["number_players"], player=player,
+    )
+
+def watched_poll(game_id, name, build):
+    """Answer a poll from the game's watcher state while the game is watched.
+
+    The body is encoded once per state version for all pollers. Views call
+    this before anything async, so answering takes no hop to the background
+    loop; None means nobody watches the game, answer the usual way.
+    """
+    watcher = game_events.watching(game_id)
+    encoded = watcher.encoded(name, build) if watcher is not None else None
+    if encoded is None:
+        return None
+    body, etag = encoded
+    return conditional(body, 'application/json', etag)
+
+def player_count(state):
+    if state["numberOfPlayers"] is None:
+        return None
+    return {'count': state["count"], 'users': state["players"], 'number_players': state["numberOfPlayers"]}
 
 @app.route('/<string:game_id>/get_player_count', methods=['GET'])
 def get_player_count(game_id):
-    game = games[game_id]
+    return watched_poll(game_id, 'get_player_count', player_count) or app.ensure_sync(polled_player_count)(game_id)
+
+async def polled_player_count(game_id):
+    game = await load_game(game_id)
 
-    return jsonify({'count': len(game["users"]), 'users': game["users"], 'number_players': games[game_id]["number_players"]})
+    return json_response({'count': len(game["users"]), 'users': game["users"], 'number_players': game["number_players"]})
 
 @app.route('/<game_id>/check_results')
-async def get_results_ready(game_id):
+def get_results_ready(game_id):
+    ready = lambda state: {'ready': state["stage"] == "result"}
+    return watched_poll(game_id, 'check_results', ready) or app.ensure_sync(polled_results_ready)(game_id)
+
+async def polled_results_ready(game_id):
     client = await get_client()  
 
     trivia_workflow = client.get_workflow_handle(f'trivia-game-{game_id}')
-    progress: List[Dict] = []
-    while not progress:
-        try:
-            progress = await trivia_workflow.query("getProgress")
-        except:
-            pass
+    progress = await query_workflow(trivia_workflow, "getProgress")
 
-    if progress["stage"] == "result":
-        return jsonify({'ready': True})
-    else:
-        return jsonify({'ready': False})
+    return json_response({'ready': progress["stage"] == "result"})
 
 @app.route('/<game_id>/check_ready', methods=['GET'])
-async def check_ready(game_id):
+def check_ready(game_id):
+    ready = lambda state: {'ready': state["ready"]}
+    return watched_poll(game_id, 'check_ready', ready) or app.ensure_sync(polled_ready)(game_id)
 
+async def polled_ready(game_id):
     client = await get_client()
    
     trivia_workflow = client.get_workflow_handle(f'trivia-game-{game_id}')
-    questions: List[Dict] = []
-    while not questions:
-        try:
-            questions = await trivia_workflow.query("getQuestions")            
-        except:
-            pass
-
-    if not questions:
-        return jsonify({'ready': False})
+    questions = await question_cache.get(trivia_workflow, game_id, allow_empty=True)
+
+    return json_response({'ready': questions is not None})
+
+# serve.py answers /events and /state on its event loop (see streams.py),
+# these views serve them elsewhere, e.g. the development server.
+@app.route('/<game_id>/events')
+def events(game_id):
+    return Response(
+        game_events.stream(game_id),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'},
+    )
+
+@app.route('/<game_id>/state')
+def state(game_id):
+    since = request.args.get('since', 0, type=int)
+    timeout = min(max(request.args.get('timeout', LONG_POLL_TIMEOUT, type=float), 0), LONG_POLL_TIMEOUT)
+    full, compact = game_events.snapshot(game_id, since, timeout)
+    if full is None:
+        raise GameUnavailable(f"State of game {game_id} is not available yet")
+    if full.get("error"):
+        raise GameNotFound(f"Game {game_id} not found")
+    return Response(compact, mimetype='application/json', headers={'Cache-Control': 'no-store'})
+
+@app.route('/<game_id>/qr')
+async def qr_code(game_id):
+    await load_game(game_id)
+    svg, etag = qr_codes.get(game_id)
+    response = Response(svg, mimetype='image/svg+xml')
+    response.set_etag(etag)
+    # The code for a game id never changes.
+    response.headers['Cache-Control'] = 'public, max-age=86400, immutable'
+    return response.make_conditional(request)
+
+def question_progress(question, progress):
+    if question == progress["numberOfQuestions"] and progress["stage"] == "scores":
+        return {'ready': True, 'show_score' : True}
+    elif question != progress["currentQuestion"] and progress["stage"] == "answers":
+        return {'ready': True, 'show_score' : False}
     else:
-        if game_id in games:
-            games[game_id]["questions"] = questions
-        return jsonify({'ready': True})
+        return {'ready': False, 'show_score' : False}
 
 @app.route('/<game_id>/<question>/check_progress', methods=['GET'])
-async def check_progress(game_id, question):
+def check_progress(game_id, question):
+    question = int(question)
+    progress = lambda state: question_progress(question, state)
+    return (
+        watched_poll(game_id, f'check_progress/{question}', progress)
+        or app.ensure_sync(polled_progress)(game_id, question)
+    )
 
+async def polled_progress(game_id, question):
     client = await get_client()
    
     trivia_workflow = client.get_workflow_handle(f'trivia-game-{game_id}')
-    progress: List[Dict] = []
-    while not progress:
-        try:
-            progress = await trivia_workflow.query("getProgress")
-        except:
-            pass
+    progress = await query_workflow(trivia_workflow, "getProgress")
 
-    question = int(question)
-    if question == progress["numberOfQuestions"] and progress["stage"] == "scores":
-        return jsonify({'ready': True, 'show_score' : True})
-    elif question != progress["currentQuestion"] and progress["stage"] == "answers":
-            return jsonify({'ready': True, 'show_score' : False})
-    else:
-        return jsonify({'ready': False, 'show_score' : False})
+    return json_response(question_progress(question, progress))
 
 
+def current_question(questions, progress):
+    """The question the game is on, None before it starts."""
+    try:
+        return questions[progress["currentQuestion"]]
+    except (KeyError, TypeError):
+        return None
+
 @app.route('/<game_id>/play', methods=['GET', 'POST'])
 async def play(game_id):
 
     client = await get_client()
     trivia_workflow = client.get_workflow_handle(f'trivia-game-{game_id}')
-    questions = games[game_id]["questions"]
-
-    progress: List[Dict] = []
-    while not progress:
-        try:
-            progress = await trivia_workflow.query("getProgress")
-        except:
-            pass
-
-    i=str(progress["currentQuestion"])
-    question = questions[i]["question"]
-    choices = questions[i]["multipleChoiceAnswers"]
+    questions, progress = await question_cache.get_with_progress(trivia_workflow, game_id)
+    question = current_question(questions, progress)
+    if question is None:
+        return error_response(f"Game {game_id} has no question open", 409)
+    i = str(question.number)
 
     if request.method == 'GET':
-        return render_template('play.html', question=question, choices=choices, game_id=game_id, answer_limit=games[game_id]["answer_limit"])
+        return render_template(
+            'play.html',
+            question=question,
+            choices_html=question.fragment('fragments/play_choices.html'),
+            game_id=game_id,
+            answer_limit=(await load_game(game_id))["answer_limit"],
+        )
     else:
-        progress: List[Dict] = []
-        while not progress:
-            try:
-                progress = await trivia_workflow.query("getProgress")
-            except:
-                return jsonify({'status': 'error'})
-
-        choice = request.form['choice']
-        choice_lower = choice.lower()
-
-        AnswerSignalInput = AnswerSignal(
-            action="Answer",
-            player=session['username'],
-            question=int(i),
-            answer=choice_lower
-        )   
-
-        if "answers" not in games[game_id]:
-            games[game_id]["answers"] = {}
-
-        index = int(i)
-        while len(games[game_id]["answers"]) <= index:
-            games[game_id]["answers"].append({})
-        games[game_id]["answers"][index][session['username']] = {
-            'choice': choice,
-            'correct': questions[i]['answer']
-        }          
-
-        await trivia_workflow.signal("answer-signal", AnswerSignalInput)         
+        # The workflow gets the answer from the answer queue, the browser is
+        # answered as soon as it's checked against the cached question.
+        posted = request.form.get('choice', '')
+        # Tallies and the results table use the question's own letters.
+        choice = question.letter(posted)
+        if choice is None:
+            return error_response(f"{posted!r} is not a choice of question {i}", 400)
+        if progress["stage"] != "answers":
+            return error_response(f"Question {i} is closed", 409)
+
+        player = session['username']
+        try:
+            answer = AnswerSignal(action="Answer", player=player, question=question.number, answer=choice.lower())
+        except ValueError as e:
+            return error_response(str(e), 400)
+        await update_game(game_id, lambda g: record_answer(g, question.number, question.answer, player, choice))
+
+        answer_queue.submit(game_id, answer)
+        game_events.poke(game_id)
 
         return jsonify({'status': 'success'})
 
@@ -427,36 +519,34 @@ async def play(game_id):
 async def results(game_id,choice):
     client = await get_client()
     trivia_workflow = client.get_workflow_handle(f'trivia-game-{game_id}')
-    questions = games[game_id]["questions"]
-
-    progress: List[Dict] = []
-    while not progress:
-        try:
-            progress = await trivia_workflow.query("getProgress")
-        except:
-            pass
-
-    i=str(progress["currentQuestion"])
-    question = questions[i]["question"]
-    answer = questions[i]["answer"]
-    choices = questions[i]["multipleChoiceAnswers"]
-
-    index = int(i)
-    while len(games[game_id]["answers"]) <= index:
-        games[game_id]["answers"].append({})
-
-    return render_template('results.html', results=games[game_id]["answers"][index], question_number=i, question=question, choices=choices, answer=answer, game_id=game_id, stage=progress["stage"])
+    # Leaders by the workflow's scores, like the end page shows them.
+    (questions, progress), players = await asyncio.gather(
+        question_cache.get_with_progress(trivia_workflow, game_id),
+        query_workflow(trivia_workflow, "getPlayers", allow_empty=True),
+    )
+    question = current_question(questions, progress)
+    if question is None:
+        return error_response(f"Game {game_id} has no question open", 409)
+
+    game = await load_game(game_id)
+    tally = question_tally(game, question.number)
+    top = leaders(players)
+    return rendering.page(
+        'results.html',
+        (game_id, question.number, progress["stage"], json_encode(tally), json_encode(top)),
+        tally=tally,
+        leaders=top,
+        question_number=str(question.number),
+        question=question,
+        game_id=game_id,
+        stage=progress["stage"],
+    )
 
 @app.route('/<game_id>/view')
 async def view(game_id):  
     client = await get_client()
     trivia_workflow = client.get_workflow_handle(f'trivia-game-{game_id}')
-    players: List[Dict] = []
-    while not players:
-        try:
-            players = await trivia_workflow.query("getPlayers")
-        except:
-            pass
+    players = await query_workflow(trivia_workflow, "getPlayers")
 
     return render_template('end.html', players=players, game_id=game_id)
 
@@ -464,51 +554,46 @@ async def view(game_id):
 async def end(game_id):  
     client = await get_client()
     trivia_workflow = client.get_workflow_handle(f'trivia-game-{game_id}')
-
-    players: List[Dict] = []
-    while not players:
-        try:
-            players = await trivia_workflow.query("getPlayers")
-        except:
-            pass
-
-    progress: List[Dict] = []
-    while not progress:
-        try:
-            progress = await trivia_workflow.query("getProgress")
-        except:
-            pass
+    state = await query_state(trivia_workflow, require=("players",))
+    players, progress = state["players"], state["progress"]
 
     if progress["stage"] == "scores":
-        if game_id in games:
-            del games[game_id]   
+        await game_store.delete_async(game_id)
 
-    qr_file = f'static/qr/qr-{game_id}.gif'
-    if os.path.isfile(qr_file):
-        os.remove(qr_file)
+    qr_codes.discard(game_id)
+    question_cache.discard(game_id)
 
     return render_template('end.html', players=players, game_id=game_id)
 
+@app.route('/ready')
+def ready():
+    # Serving is all it takes, Temporal connects in the background and
+    # requests needing it wait for or retry the connection.
+    return jsonify(ready=True, temporal='connected' if pool.connected else 'connecting')
+
+@app.after_request
+def first_request_served(response):
+    startup_profile.first_request()
+    return response
+
+@app.route('/metrics/games')
+def game_usage():
+    # Bytes held per game, largest first.
+    usage = sorted(game_store.usage().items(), key=lambda item: -item[1])
+    return jsonify(games=dict(usage), total=sum(size for _, size in usage))
+
+@app.route('/metrics')
+def get_metrics():
+    return Response(metrics.render(), mimetype='text/plain; version=0.0.4')
+
 @app.route('/get_cname')
 async def get_cname():
+    return jsonify(cname=await temporal_cname.get())
 
-    cname = None
-    parsed_url = urlparse('//' + os.getenv("TEMPORAL_HOST_URL")) 
-    hostname = parsed_url.hostname
-    try:
-        result = dns.resolver.resolve(hostname, 'CNAME')
-        for rdata in result:
-            cname=str(rdata.target)
-    except dns.resolver.NoAnswer:
-        print('No CNAME record found for', hostname)
-    except dns.resolver.NXDOMAIN:
-        print('No such domain', hostname)
-    except dns.resolver.Timeout:
-        print('Timeout while querying', hostname)
-    except Exception as e:
-        print('Error occurred: ', e)
-    return jsonify(cname=cname)
+startup_profile.report("app loaded")
 
 if __name__ == "__main__":
-    app.run(host="0.0.0.0", debug=True) 
+    signal.signal(signal.SIGUSR1, profiler.toggle)
+    # Development server, use serve.py in production.
+    app.run(host="0.0.0.0", debug=os.getenv("FLASK_DEBUG") == "1")
 
@@ -0,0 +1,191 @@
+"""Static assets under content-hashed URLs, precompressed, cached for good.
+
+Templates link assets with ``asset_url('base.css')``, which gives
+``/assets/base.<hash>.css``. The hash changes with the content, so browsers
+may keep what they downloaded forever and never revalidate. Gzip and Brotli
+variants are written next to an asset by the build step below and sent to
+browsers accepting them, nothing is compressed per request.
+
+Build step, after changing anything in static/ (needs the ``assets`` group):
+
+    $ poetry install --with assets
+    $ poetry run python assets.py
+"""
+from flask import Flask, Response, abort, request, send_file
+from typing import Dict, List, Optional, Tuple
+import hashlib
+import mimetypes
+import os
+import re
+import threading
+
+# Precompressed variants by Content-Encoding, in order of preference.
+ENCODINGS = (("br", ".br"), ("gzip", ".gz"))
+COMPRESSIBLE = (".css", ".js", ".svg", ".json", ".txt", ".html")
+# Built from another asset, which is still served for old links.
+CONVERTED = {"Temporal_Logo_Animation.webp": "Temporal_Logo_Animation.ac2f7996.gif"}
+
+
+class Asset:
+    __slots__ = ("name", "path", "url_name", "etag", "mimetype", "size", "variants")
+
+    def __init__(self, name: str, path: str) -> None:
+        with open(path, "rb") as f:
+            digest = hashlib.sha256(f.read()).hexdigest()[:12]
+        stem, ext = os.path.splitext(name)
+        self.name = name
+        self.path = path
+        self.url_name = f"{stem}.{digest}{ext}"
+        self.etag = digest
+        self.mimetype = mimetypes.guess_type(name)[0] or "application/octet-stream"
+        self.size = os.path.getsize(path)
+        # Content-Encoding -> (path, size), only if the file is there.
+        self.variants: Dict[str, Tuple[str, int]] = {
+            encoding: (path + suffix, os.path.getsize(path + suffix))
+            for encoding, suffix in ENCODINGS
+            if os.path.exists(path + suffix)
+        }
+
+
+class StaticAssets:
+    """Fingerprinted, precompressed serving of the files in ``folder``.
+
+    The folder is scanned once, on the first ``asset_url``; restart (or
+    redeploy) to pick up changed assets.
+    """
+
+    def __init__(self, folder: str, url_prefix: str = "/assets", max_age: int = 365 * 24 * 60 * 60) -> None:
+        self.folder = folder
+        self.url_prefix = url_prefix
+        self.max_age = max_age
+
+        self._lock = threading.Lock()
+        self._by_name: Optional[Dict[str, Asset]] = None
+        self._by_url: Dict[str, Asset] = {}
+
+    def init_app(self, app: Flask) -> None:
+        app.add_url_rule(f"{self.url_prefix}/<path:filename>", "asset", self.serve)
+        app.add_template_global(self.url, "asset_url")
+
+    def url(self, name: str) -> str:
+        return f"{self.url_prefix}/{self._assets()[name].url_name}"
+
+    def version(self) -> str:
+        """Changes whenever any asset does, like every page linking them."""
+        return hashlib.sha256(" ".join(a.url_name for a in self._assets().values()).encode()).hexdigest()[:12]
+
+    def serve(self, filename: str) -> Response:
+        self._assets()
+        asset = self._by_url.get(filename)
+        if asset is None:
+            abort(404)
+
+        encoding = next((e for e, _ in ENCODINGS if e in asset.variants and e in request.accept_encodings), None)
+        if encoding is None:
+            response = send_file(asset.path, mimetype=asset.mimetype, etag=False, conditional=False)
+            response.set_etag(asset.etag)
+        else:
+            response = send_file(asset.variants[encoding][0], mimetype=asset.mimetype, etag=False, conditional=False)
+            response.headers["Content-Encoding"] = encoding
+            response.set_etag(f"{asset.etag}-{encoding}")
+        if asset.variants:
+            response.vary.add("Accept-Encoding")
+        # The URL changes with the content, it can be cached for good.
+        response.headers["Cache-Control"] = f"public, max-age={self.max_age}, immutable"
+        return response.make_conditional(request)
+
+    def _assets(self) -> Dict[str, Asset]:
+        with self._lock:
+            if self._by_name is None:
+                self._by_name = {}
+                for name in sorted(os.listdir(self.folder)):
+                    path = os.path.join(self.folder, name)
+                    if os.path.isfile(path) and not name.endswith(tuple(s for _, s in ENCODINGS)):
+                        asset = self._by_name[name] = Asset(name, path)
+                        self._by_url[asset.url_name] = asset
+            return self._by_name
+
+
+def _convert_gif(source: str, target: str, size: int = 600) -> None:
+    """Animated GIF to animated WebP at ``size`` pixels, twice the displayed size."""
+    from PIL import Image, ImageSequence
+
+    with Image.open(source) as gif:
+        frames, durations = [], []
+        for frame in ImageSequence.Iterator(gif):
+            # The pages are white, flattening drops the costly alpha channel.
+            flat = Image.new("RGB", frame.size, "white")
+            rgba = frame.convert("RGBA")
+            flat.paste(rgba, mask=rgba.getchannel("A"))
+            frames.append(flat.resize((size, size * frame.height // frame.width), Image.LANCZOS))
+            durations.append(frame.info.get("duration", 40))
+    frames[0].save(
+        target, save_all=True, append_images=frames[1:], duration=durations,
+        loop=0, quality=70, method=4, minimize_size=True,
+    )
+
+
+def _compress(path: str) -> None:
+    """Write .gz and .br next to ``path`` when they're meaningfully smaller."""
+    import brotli
+    import gzip
+
+    with open(path, "rb") as f:
+        data = f.read()
+    for suffix, compressed in (
+        (".gz", gzip.compress(data, compresslevel=9, mtime=0)),
+        (".br", brotli.compress(data, quality=11)),
+    ):
+        if len(compressed) < len(data) * 0.9:
+            with open(path + suffix, "wb") as f:
+                f.write(compressed)
+        elif os.path.exists(path + suffix):
+            os.remove(path + suffix)
+
+
+def _page_assets(templates: str) -> Dict[str, List[str]]:
+    """Assets each page template links, including those of the templates it extends."""
+    sources = {}
+    for name in os.listdir(templates):
+        if name.endswith(".html"):
+            with open(os.path.join(templates, name)) as f:
+                sources[name] = f.read()
+
+    def linked(name: str) -> List[str]:
+        source = sources.get(name, "")
+        names = re.findall(r"asset_url\(['\"]([^'\"]+)['\"]\)", source)
+        parent = re.search(r"{%\s*extends\s+['\"]([^'\"]+)['\"]", source)
+        return names + (linked(parent.group(1)) if parent else [])
+
+    return {name: linked(name) for name in sorted(sources) if name != "base.html"}
+
+
+def build(folder: str, templates: str) -> None:
+    for webp, gif in CONVERTED.items():
+        _convert_gif(os.path.join(folder, gif), os.path.join(folder, webp))
+    for name in os.listdir(folder):
+        if name.endswith(COMPRESSIBLE):
+            _compress(os.path.join(folder, name))
+
+    assets = StaticAssets(folder)._assets()
+    original = {webp: assets[gif].size for webp, gif in CONVERTED.items()}
+    print(f"{'asset':<40}{'bytes':>10}{'served':>10}")
+    for name, asset in sorted(assets.items()):
+        served = min([asset.size] + [size for _, size in asset.variants.values()])
+        print(f"{name:<40}{original.get(name, asset.size):>10}{served:>10}")
+
+    # First visit; afterwards pages load their assets from the browser cache.
+    print(f"\n{'page':<40}{'before':>10}{'after':>10}{'saved':>10}")
+    for page, names in _page_assets(templates).items():
+        # Browsers showing the converted asset skip its fallback.
+        names = [n for n in names if n not in CONVERTED.values()]
+        before = sum(original.get(n, assets[n].size) for n in names)
+        after = sum(min([assets[n].size] + [s for _, s in assets[n].variants.values()]) for n in names)
+        print(f"{page:<40}{before:>10}{after:>10}{before - after:>10}")
+
+
+assets = StaticAssets(os.path.join(os.path.dirname(os.path.abspath(__file__)), "static"))
+
+if __name__ == "__main__":
+    root = os.path.dirname(os.path.abspath(__file__))
+    build(os.path.join(root, "static"), os.path.join(root, "templates"))
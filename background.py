@@ -0,0 +1,99 @@
+from typing import Awaitable, Callable, Optional, TypeVar
+import asyncio
+import concurrent.futures
+import threading
+
+T = TypeVar("T")
+
+
+class BackgroundLoop:
+    """An asyncio event loop running in a daemon thread.
+
+    Used for work that outlives a single request, like game watchers. The
+    thread is started on first use so forking servers get one per worker.
+    """
+
+    def __init__(self, name: str = "trivia-background") -> None:
+        self.name = name
+        self._lock = threading.Lock()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def loop(self) -> asyncio.AbstractEventLoop:
+        with self._lock:
+            if self._loop is None or self._loop.is_closed():
+                ready = threading.Event()
+                self._loop = asyncio.new_event_loop()
+                self._thread = threading.Thread(
+                    target=self._run, args=(self._loop, ready), name=self.name, daemon=True
+                )
+                self._thread.start()
+                ready.wait()
+            return self._loop
+
+    def submit(self, coro: Awaitable[T]) -> "concurrent.futures.Future[T]":
+        """Schedule a coroutine on the loop from any thread."""
+        return asyncio.run_coroutine_threadsafe(coro, self.loop)
+
+    def call_soon(self, callback, *args) -> None:
+        self.loop.call_soon_threadsafe(callback, *args)
+
+    @staticmethod
+    def _run(loop: asyncio.AbstractEventLoop, ready: threading.Event) -> None:
+        asyncio.set_event_loop(loop)
+        loop.call_soon(ready.set)
+        loop.run_forever()
+
+
+
+class Refresher:
+    """Something refreshed on the background loop, one run at a time.
+
+    ``refresh`` starts ``fn`` or joins the run in flight, so concurrent callers
+    share it. ``keep`` starts a task, unless one is running, that refreshes
+    every ``interval()`` seconds for as long as ``active()`` holds (forever
+    without it). Its failures are printed as "Failed to <what>: <error>" and
+    the next round tries again.
+    """
+
+    def __init__(
+        self,
+        fn: Callable[[], Awaitable[None]],
+        what: str,
+        interval: Callable[[], float],
+        active: Optional[Callable[[], bool]] = None,
+    ) -> None:
+        self.fn = fn
+        self.what = what
+        self.interval = interval
+        self.active = active
+
+        self._lock = threading.Lock()
+        self._running: Optional[concurrent.futures.Future] = None
+        self._keeper: Optional[concurrent.futures.Future] = None
+
+    def refresh(self) -> concurrent.futures.Future:
+        with self._lock:
+            if self._running is None or self._running.done():
+                self._running = background.submit(self.fn())
+            return self._running
+
+    async def wait(self) -> None:
+        """Refresh and wait for it from any loop, cancelling only stops the wait."""
+        await asyncio.shield(asyncio.wrap_future(self.refresh()))
+
+    def keep(self) -> None:
+        with self._lock:
+            if self._keeper is None or self._keeper.done():
+                self._keeper = background.submit(self._keep())
+
+    async def _keep(self) -> None:
+        while self.active is None or self.active():
+            try:
+                await asyncio.wrap_future(self.refresh())
+            except Exception as e:
+                print(f"Failed to {self.what}: {e}")
+            await asyncio.sleep(self.interval())
+
+background = BackgroundLoop()
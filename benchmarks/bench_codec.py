@@ -0,0 +1,73 @@
+"""Payloads/s of EncryptionCodec across batch and payload sizes.
+
+Compares encoding/decoding on the event loop with batches split across the
+codec's thread pool, and measures how long the loop is blocked per batch.
+
+    $ poetry install --with encryption
+    $ poetry run python benchmarks/bench_codec.py
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from temporalio.api.common.v1 import Payload  # noqa: E402
+
+from encryption_codec import EncryptionCodec  # noqa: E402
+
+
+async def measure(codec: EncryptionCodec, payloads, duration: float) -> dict:
+    loop = asyncio.get_running_loop()
+    # A ticker that notices how late the loop gets to it.
+    worst_lag = 0.0
+    running = True
+
+    async def ticker() -> None:
+        nonlocal worst_lag
+        while running:
+            expected = loop.time() + 0.001
+            await asyncio.sleep(0.001)
+            worst_lag = max(worst_lag, loop.time() - expected)
+
+    tick = asyncio.ensure_future(ticker())
+    done = 0
+    started = time.perf_counter()
+    while time.perf_counter() - started < duration:
+        decoded = await codec.decode(await codec.encode(payloads))
+        assert len(decoded) == len(payloads)
+        done += len(payloads)
+        await asyncio.sleep(0)  # let the ticker see how long we held the loop
+    elapsed = time.perf_counter() - started
+    running = False
+    await tick
+    return {"rate": done / elapsed, "lag_ms": worst_lag * 1000}
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--duration", type=float, default=2)
+    parser.add_argument("--payload-size", type=int, nargs="+", default=[256, 65536, 1048576])
+    parser.add_argument("--batch", type=int, nargs="+", default=[1, 8, 64, 256])
+    args = parser.parse_args()
+
+    serial = EncryptionCodec(parallel_threshold=sys.maxsize)
+    parallel = EncryptionCodec()
+
+    print(f"round trips (encode + decode), {parallel.max_workers} codec threads, threshold {parallel.parallel_threshold} bytes")
+    print(f"{'payload':>8}{'batch':>7}{'serial/s':>12}{'lag ms':>8}{'pooled/s':>12}{'lag ms':>8}")
+    for size in args.payload_size:
+        for batch in args.batch:
+            payloads = [
+                Payload(metadata={"encoding": b"json/plain"}, data=os.urandom(size))
+                for _ in range(batch)
+            ]
+            a = await measure(serial, payloads, args.duration)
+            b = await measure(parallel, payloads, args.duration)
+            print(f"{size:>8}{batch:>7}{a['rate']:>12.0f}{a['lag_ms']:>8.1f}{b['rate']:>12.0f}{b['lag_ms']:>8.1f}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
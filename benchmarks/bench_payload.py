@@ -0,0 +1,87 @@
+"""Payload bytes and codec time of a game's questions, per game size.
+
+Encodes a ``getQuestions`` result the way the data converter does, with no
+codec, compression, encryption and compression followed by encryption, and
+prints the payload size and encode/decode time per game.
+
+    $ poetry install --with encryption
+    $ poetry run python benchmarks/bench_payload.py --questions 5 20 50 100
+"""
+import argparse
+import asyncio
+import dataclasses
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from temporalio.converter import DataConverter  # noqa: E402
+
+from encryption_codec import CodecChain, CompressionCodec, EncryptionCodec  # noqa: E402
+
+WORDS = (
+    "which of the following temporal workflow activity signal query worker task queue "
+    "history event retry timeout durable execution replay deterministic namespace "
+    "cluster service language sdk is a an most best describes when why how does"
+).split()
+
+
+def sentence(rng: random.Random, words: int) -> str:
+    return " ".join(rng.choice(WORDS) for _ in range(words)).capitalize()
+
+
+def questions(count: int, seed: int = 1) -> dict:
+    """Like a getQuestions result with long AI-generated questions."""
+    rng = random.Random(seed)
+    return {
+        str(i): {
+            "question": sentence(rng, 40) + "?",
+            "multipleChoiceAnswers": {c: sentence(rng, 12) for c in "ABCD"},
+            "answer": rng.choice("ABCD"),
+        }
+        for i in range(1, count + 1)
+    }
+
+
+async def measure(converter: DataConverter, value: dict, repeat: int) -> dict:
+    payloads = await converter.encode([value])
+    started = time.perf_counter()
+    for _ in range(repeat):
+        await converter.encode([value])
+    encode = (time.perf_counter() - started) / repeat
+    started = time.perf_counter()
+    for _ in range(repeat):
+        decoded = await converter.decode(payloads, [dict])
+    decode = (time.perf_counter() - started) / repeat
+    assert decoded == [value]
+    return {"bytes": sum(p.ByteSize() for p in payloads), "encode_ms": encode * 1000, "decode_ms": decode * 1000}
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--questions", type=int, nargs="+", default=[5, 20, 50, 100])
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    codecs = {
+        "none": None,
+        "compression": CompressionCodec(),
+        "encryption": EncryptionCodec(),
+        "compression+encryption": CodecChain(CompressionCodec(), EncryptionCodec()),
+    }
+    print(f"{'questions':>9}  {'codec':<24}{'bytes':>10}{'ratio':>8}{'encode ms':>11}{'decode ms':>11}")
+    for count in args.questions:
+        value = questions(count)
+        plain = None
+        for name, codec in codecs.items():
+            converter = dataclasses.replace(DataConverter.default, payload_codec=codec)
+            result = await measure(converter, value, args.repeat)
+            plain = plain or result["bytes"]
+            print(f"{count:>9}  {name:<24}{result['bytes']:>10}{result['bytes'] / plain:>8.2f}"
+                  f"{result['encode_ms']:>11.3f}{result['decode_ms']:>11.3f}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,92 @@
+"""Requests/s of the pages' poll endpoints and of refreshing lobby/results.
+
+Runs the app in-process against fake_temporal with one started game and
+hits each endpoint for ``--duration`` seconds, three ways:
+
+  uncached     nobody watches the game, every page is rendered (as before
+               the poll fast path and the page cache)
+  watched      a browser holds the game's event stream: polls are answered
+               from the watcher's pre-encoded bodies, pages from the cache
+  revalidated  like watched, and the browser sends the ETag it got (304)
+
+    $ poetry run python benchmarks/bench_polls.py --duration 2
+"""
+import argparse
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+os.chdir(ROOT)
+
+import fake_temporal  # noqa: E402
+
+
+def rate(client, path: str, duration: float, etag: bool) -> float:
+    headers = {}
+    if etag:
+        headers["If-None-Match"] = client.get(path).headers["ETag"]
+    count = 0
+    stop_at = time.perf_counter() + duration
+    while time.perf_counter() < stop_at:
+        response = client.get(path, headers=headers)
+        assert response.status_code == (304 if etag else 200), (path, response.status_code)
+        count += 1
+    return count / duration
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--duration", type=float, default=2.0, help="seconds per endpoint and mode")
+    parser.add_argument("--latency", type=float, default=0.005, help="simulated Temporal round trip in seconds")
+    args = parser.parse_args()
+
+    # The game stays on its first question for the whole run.
+    fake_temporal.install(latency=args.latency, question_delay=0, answer_limit=3600)
+    from app import app
+    from events import game_events
+    from rendering import rendering
+
+    client = app.test_client()
+    response = client.post("/create_game", data={
+        "player": "host", "mode": "casual", "questions": "3", "players": "2", "category": "random",
+    })
+    game_id = response.headers["Location"].split("/")[1]
+    assert client.get(f"/{game_id}/start").status_code == 200
+
+    paths = {
+        "get_player_count": f"/{game_id}/get_player_count",
+        "check_ready": f"/{game_id}/check_ready",
+        "check_results": f"/{game_id}/check_results",
+        "check_progress": f"/{game_id}/1/check_progress",
+        "lobby": f"/{game_id}/lobby",
+        "results": f"/{game_id}/A/results",
+    }
+    results = {}
+
+    max_pages = rendering.max_pages
+    rendering.max_pages = 0
+    for name, path in paths.items():
+        results[name, "uncached"] = rate(client, path, args.duration, etag=False)
+    rendering.max_pages = max_pages
+
+    watcher = game_events.subscribe(game_id)
+    try:
+        watcher.wait(0, 10)
+        for name, path in paths.items():
+            results[name, "watched"] = rate(client, path, args.duration, etag=False)
+            results[name, "revalidated"] = rate(client, path, args.duration, etag=True)
+    finally:
+        game_events.unsubscribe(watcher)
+
+    print(f"{'requests/s':<20}{'uncached':>12}{'watched':>12}{'revalidated':>13}{'speedup':>9}")
+    for name in paths:
+        uncached, watched, revalidated = (results[name, mode] for mode in ("uncached", "watched", "revalidated"))
+        print(f"{name:<20}{uncached:>12.0f}{watched:>12.0f}{revalidated:>13.0f}{watched / uncached:>8.1f}x")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,120 @@
+"""Compare requests/s of the development server and the production server.
+
+Starts the UI once per mode on a free port, hammers a page that doesn't need
+Temporal with concurrent keep-alive clients and prints throughput and latency.
+
+    $ poetry run python benchmarks/bench_serving.py --duration 10 --concurrency 32
+"""
+import argparse
+import http.client
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import threading
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def wait_for_port(port: int, timeout: float = 30.0) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            with socket.create_connection(("127.0.0.1", port), timeout=0.5):
+                return
+        except OSError:
+            time.sleep(0.1)
+    raise RuntimeError(f"Server on port {port} did not come up")
+
+
+def start_server(mode: str, port: int, workers: int) -> subprocess.Popen:
+    env = dict(os.environ, UI_HOST="127.0.0.1", UI_PORT=str(port), UI_WORKERS=str(workers))
+    if mode == "dev":
+        # app.run() has no port setting, go through the flask CLI instead.
+        cmd = [sys.executable, "-m", "flask", "--app", "app", "run", "--port", str(port)]
+    else:
+        cmd = [sys.executable, "serve.py"]
+    return subprocess.Popen(cmd, cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+
+def load(port: int, path: str, concurrency: int, duration: float) -> dict:
+    latencies = []
+    errors = 0
+    lock = threading.Lock()
+    stop_at = time.monotonic() + duration
+
+    def client() -> None:
+        nonlocal errors
+        conn = http.client.HTTPConnection("127.0.0.1", port, timeout=10)
+        mine = []
+        while time.monotonic() < stop_at:
+            started = time.perf_counter()
+            try:
+                conn.request("GET", path)
+                response = conn.getresponse()
+                response.read()
+                if response.status >= 500:
+                    raise RuntimeError(response.status)
+            except Exception:
+                with lock:
+                    errors += 1
+                conn.close()
+                conn = http.client.HTTPConnection("127.0.0.1", port, timeout=10)
+                continue
+            mine.append(time.perf_counter() - started)
+        with lock:
+            latencies.extend(mine)
+
+    threads = [threading.Thread(target=client) for _ in range(concurrency)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    latencies.sort()
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "rps": len(latencies) / duration,
+        "p50_ms": statistics.median(latencies) * 1000 if latencies else 0,
+        "p99_ms": latencies[int(len(latencies) * 0.99) - 1] * 1000 if latencies else 0,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--path", default="/")
+    parser.add_argument("--duration", type=float, default=10)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args()
+
+    modes = [("dev server", "dev", 1), ("serve.py, 1 worker", "serve", 1)]
+    if args.workers > 1:
+        modes.append((f"serve.py, {args.workers} workers", "serve", args.workers))
+
+    print(f"GET {args.path}, {args.concurrency} concurrent clients, {args.duration:.0f}s per mode")
+    print(f"{'mode':<24}{'req/s':>10}{'p50 ms':>10}{'p99 ms':>10}{'errors':>8}")
+    for label, mode, workers in modes:
+        port = free_port()
+        server = start_server(mode, port, workers)
+        try:
+            wait_for_port(port)
+            load(port, args.path, args.concurrency, 1)  # warm up
+            result = load(port, args.path, args.concurrency, args.duration)
+        finally:
+            server.terminate()
+            server.wait(30)
+        print(f"{label:<24}{result['rps']:>10.0f}{result['p50_ms']:>10.1f}{result['p99_ms']:>10.1f}{result['errors']:>8}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""Measure cold start: process launch until the first request is answered.
+
+Starts ``serve.py`` with one worker on a free port, polls ``/ready`` until it
+answers 200 and repeats. Temporal doesn't need to be reachable, the client
+connects in the background. Also reports what the dependencies loaded on
+first use (QR codes, DNS, cryptography) would add if imported up front.
+
+    $ poetry run python benchmarks/bench_startup.py --runs 10
+"""
+import argparse
+import http.client
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+LAZY_IMPORTS = "import qrcode, qrcode.image.svg, dns.asyncresolver, cryptography.hazmat.primitives.ciphers.aead"
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def first_response(port: int, timeout: float = 60.0) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            conn = http.client.HTTPConnection("127.0.0.1", port, timeout=1)
+            conn.request("GET", "/ready")
+            if conn.getresponse().status == 200:
+                return
+        except OSError:
+            pass
+        time.sleep(0.005)
+    raise RuntimeError(f"Server on port {port} did not come up")
+
+
+def cold_start() -> float:
+    port = free_port()
+    env = dict(os.environ, UI_HOST="127.0.0.1", UI_PORT=str(port), UI_WORKERS="1")
+    started = time.perf_counter()
+    server = subprocess.Popen(
+        [sys.executable, "serve.py"], cwd=ROOT, env=env,
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        first_response(port)
+        return time.perf_counter() - started
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def import_time(statement: str) -> float:
+    started = time.perf_counter()
+    subprocess.run([sys.executable, "-c", statement], cwd=ROOT, check=True)
+    return time.perf_counter() - started
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    starts = [cold_start() * 1000 for _ in range(args.runs)]
+    print(f"cold start to first response over {args.runs} runs: "
+          f"median {statistics.median(starts):.0f} ms, min {min(starts):.0f} ms, max {max(starts):.0f} ms")
+
+    baseline = statistics.median(import_time("pass") for _ in range(args.runs))
+    lazy = statistics.median(import_time(LAZY_IMPORTS) for _ in range(args.runs))
+    print(f"deferred to first use (qrcode, dnspython, cryptography): {(lazy - baseline) * 1000:.0f} ms")
+    print("set PROFILE_STARTUP=1 on the server for a per-module breakdown")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
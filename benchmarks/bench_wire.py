@@ -0,0 +1,90 @@
+"""Per-signal serialization cost and memory of the workflow messages.
+
+Compares the slotted, validated messages in workflow.py and their fast JSON
+path with plain dataclasses through the default converter (what workflow.py
+used before): creating a message, encoding it to a payload, decoding it
+back, and bytes per object.
+
+    $ poetry run python benchmarks/bench_wire.py
+"""
+from dataclasses import dataclass
+from typing import Optional
+import argparse
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from temporalio.converter import DataConverter  # noqa: E402
+
+import workflow  # noqa: E402
+
+
+@dataclass
+class AnswerSignal:
+    action: str
+    player: str
+    question: int
+    answer: str
+
+
+@dataclass
+class TriviaWorkflowInput:
+    GameId: str
+    NumberOfPlayers: int
+    NumberOfQuestions: int
+    AnswerTimeLimit: int
+    StartTimeLimit: int
+    ResultTimeLimit: int
+    Category: Optional[str] = None
+
+
+CASES = {
+    "AnswerSignal": (AnswerSignal, workflow.AnswerSignal, ("Answer", "player42", 3, "b")),
+    "TriviaWorkflowInput": (TriviaWorkflowInput, workflow.TriviaWorkflowInput, ("123456", 10, 5, 15, 300, 10, "")),
+}
+
+
+def per_call(fn, repeat: int) -> float:
+    started = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - started) / repeat * 1e6
+
+
+def bytes_per_object(cls, args, count: int = 10000) -> float:
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    objects = [cls(*args) for _ in range(count)]
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del objects
+    return (after - before) / count
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=20000)
+    args = parser.parse_args()
+
+    converters = {"dataclass": DataConverter.default.payload_converter, "message": workflow.message_converter.payload_converter}
+    print(f"{'message':<22}{'kind':<11}{'create us':>10}{'encode us':>11}{'decode us':>11}{'bytes/obj':>11}")
+    for name, (plain, slotted, values) in CASES.items():
+        for kind, cls in (("dataclass", plain), ("message", slotted)):
+            converter = converters[kind]
+            value = cls(*values)
+            payload = converter.to_payloads([value])
+            assert converter.from_payloads(payload, [cls]) == [value]
+            create = per_call(lambda: cls(*values), args.repeat)
+            encode = per_call(lambda: converter.to_payloads([value]), args.repeat)
+            decode = per_call(lambda: converter.from_payloads(payload, [cls]), args.repeat)
+            print(f"{name:<22}{kind:<11}{create:>10.2f}{encode:>11.2f}{decode:>11.2f}{bytes_per_object(cls, values):>11.0f}")
+    same = DataConverter.default.payload_converter.to_payloads([CASES["AnswerSignal"][0](*CASES["AnswerSignal"][2])])
+    fast = workflow.message_converter.payload_converter.to_payloads([CASES["AnswerSignal"][1](*CASES["AnswerSignal"][2])])
+    print(f"\nidentical JSON on the wire: {same == fast}")
+
+
+if __name__ == "__main__":
+    main()
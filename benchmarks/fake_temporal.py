@@ -0,0 +1,303 @@
+"""In-process stand-in for the Temporal client and the trivia workflows.
+
+Implements just enough of ``temporalio.client.Client`` for the UI: the
+registry workflow (``getGames``), game workflows (``getState``,
+``getPlayers``, ``getProgress``, ``getQuestions``, ``start-game-signal``,
+``answer-signal``, terminating them, the started event of their history) and
+``AddPlayerWorkflow``. Game stages advance like the real workflow:
+start -> answers -> result -> ... -> scores, with the answer and result
+phases timed by the game's limits. Every call is counted and can be given a
+simulated round trip latency. With ``state_query=False`` the games answer
+``getState`` like workers predating it do.
+
+    import fake_temporal
+    fake = fake_temporal.install(latency=0.005)
+
+Run directly, it serves the UI on UI_PORT (default 5000) against fake games
+for trying pages out without a Temporal server or workers:
+
+    $ poetry run python benchmarks/fake_temporal.py [--no-state-query] [--production]
+
+``--production`` serves it with serve.py (Hypercorn) instead of Flask's
+development server.
+"""
+from collections import Counter
+from dataclasses import asdict, is_dataclass
+from typing import Dict, Optional
+import argparse
+import asyncio
+import os
+import random
+import sys
+import threading
+import time
+
+from temporalio.api.enums.v1 import EventType
+from temporalio.api.history.v1 import HistoryEvent
+from temporalio.client import WorkflowExecutionStatus, WorkflowFailureError, WorkflowQueryFailedError
+from temporalio.converter import DataConverter
+from temporalio.exceptions import ApplicationError, WorkflowAlreadyStartedError
+from temporalio.service import RPCError, RPCStatusCode
+
+REGISTRY_ID = "trivia-game"
+CHOICES = ["A", "B", "C", "D"]
+QUERIES = ("getState", "getPlayers", "getProgress", "getQuestions")
+
+
+def unknown_query(name: str, known) -> WorkflowQueryFailedError:
+    """What a Go worker answers a query it has no handler for."""
+    return WorkflowQueryFailedError(f"unknown queryType {name}. KnownQueryTypes=[{' '.join(known)}]")
+
+
+class FakeGame:
+    def __init__(self, game_id: str, number_questions: int, answer_limit: float, result_limit: float, questions_ready_at: float, input: Optional[dict] = None) -> None:
+        self.game_id = game_id
+        self.input = input or {}
+        self.started_at = time.time()
+        self.number_questions = number_questions
+        self.answer_limit = answer_limit
+        self.result_limit = result_limit
+        self.questions_ready_at = questions_ready_at
+        self.players: Dict[str, dict] = {}
+        self.questions = {
+            str(i): {
+                "question": f"Question {i}?",
+                "multipleChoiceAnswers": {c: f"Answer {c}" for c in CHOICES},
+                "answer": random.choice(CHOICES),
+            }
+            for i in range(1, number_questions + 1)
+        }
+        self.stage = "start"
+        self.current_question = 0
+        self.stage_started = time.monotonic()
+        self.answered = set()
+
+    def advance(self) -> None:
+        """Move through timed stages, called before every read."""
+        now = time.monotonic()
+        if self.stage == "answers" and now - self.stage_started >= self.answer_limit:
+            self._enter("result")
+        if self.stage == "result" and now - self.stage_started >= self.result_limit:
+            if self.current_question >= self.number_questions:
+                self._enter("scores")
+            else:
+                self.current_question += 1
+                self.answered = set()
+                self._enter("answers")
+
+    def start(self) -> None:
+        if self.stage == "start":
+            self.current_question = 1
+            self._enter("answers")
+
+    def answer(self, player: str, question: int, answer: str) -> None:
+        if self.stage != "answers" or question != self.current_question or player in self.answered:
+            return
+        self.answered.add(player)
+        # The UI sends answers in lower case.
+        if answer.upper() == self.questions[str(question)]["answer"]:
+            self.players[player]["score"] += 1
+        if len(self.answered) >= len(self.players):
+            self._enter("result")
+
+    def query(self, name: str, arg=None):
+        self.advance()
+        if name == "getState":
+            state = {"progress": self.query("getProgress"), "players": self.query("getPlayers")}
+            if arg:
+                state["questions"] = self.query("getQuestions")
+            return state
+        if name == "getPlayers":
+            return {p: dict(v) for p, v in self.players.items()}
+        if name == "getProgress":
+            return {
+                "stage": self.stage,
+                "currentQuestion": self.current_question,
+                "numberOfQuestions": self.number_questions,
+            }
+        if name == "getQuestions":
+            return self.questions if time.monotonic() >= self.questions_ready_at else {}
+        raise unknown_query(name, QUERIES)
+
+    def _enter(self, stage: str) -> None:
+        self.stage = stage
+        self.stage_started = time.monotonic()
+
+
+class FakeDescription:
+    def __init__(self, status: WorkflowExecutionStatus) -> None:
+        self.status = status
+
+
+class FakeHandle:
+    def __init__(self, client: "FakeTemporalClient", id: str, error: Optional[BaseException] = None) -> None:
+        self.client = client
+        self.id = id
+        self.error = error
+
+    async def describe(self) -> FakeDescription:
+        await self.client.call("describe")
+        self.client.lookup(self.id)
+        return FakeDescription(WorkflowExecutionStatus.RUNNING)
+
+    async def query(self, name: str, arg=None, **kwargs):
+        await self.client.call(f"query:{name}")
+        with self.client.lock:
+            if self.id == REGISTRY_ID:
+                self.client.lookup(self.id)
+                return list(self.client.games)
+            game = self.client.lookup(self.id)
+            if name == "getState" and not self.client.state_query:
+                raise unknown_query(name, QUERIES[1:])
+            return game.query(name, arg)
+
+    async def terminate(self, reason: Optional[str] = None, **kwargs) -> None:
+        await self.client.call("terminate")
+        with self.client.lock:
+            self.client.lookup(self.id)
+            del self.client.games[self.id[len("trivia-game-"):]]
+
+    async def signal(self, name: str, arg=None, **kwargs) -> None:
+        await self.client.call(f"signal:{name}")
+        if is_dataclass(arg):
+            arg = asdict(arg)
+        with self.client.lock:
+            game = self.client.lookup(self.id)
+            game.advance()
+            if name == "start-game-signal":
+                game.start()
+            elif name == "answer-signal":
+                game.answer(arg["player"], int(arg["question"]), arg["answer"])
+            else:
+                raise ValueError(f"Unknown signal {name}")
+
+    async def fetch_history_events(self, **kwargs):
+        await self.client.call("history")
+        with self.client.lock:
+            game = self.client.lookup(self.id)
+        event = HistoryEvent(event_id=1, event_type=EventType.EVENT_TYPE_WORKFLOW_EXECUTION_STARTED)
+        event.event_time.FromSeconds(int(game.started_at))
+        payloads = await self.client.data_converter.encode([game.input])
+        event.workflow_execution_started_event_attributes.input.payloads.extend(payloads)
+        yield event
+
+    async def result(self):
+        await self.client.call("result")
+        if self.error is not None:
+            raise self.error
+        return None
+
+
+class FakeTemporalClient:
+    """Enough of ``temporalio.client.Client`` to drive the UI."""
+
+    def __init__(
+        self,
+        latency: float = 0.0,
+        question_delay: float = 0.5,
+        result_limit: float = 0.5,
+        answer_limit: Optional[float] = None,
+        state_query: bool = True,
+    ) -> None:
+        self.latency = latency
+        self.question_delay = question_delay
+        self.result_limit = result_limit
+        self.answer_limit = answer_limit
+        self.state_query = state_query
+        self.lock = threading.Lock()
+        self.calls: Counter = Counter()
+        self.games: Dict[str, FakeGame] = {}
+        self.registry_running = False
+        self.data_converter = DataConverter.default
+
+    async def call(self, kind: str) -> None:
+        with self.lock:
+            self.calls[kind] += 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+
+    def lookup(self, workflow_id: str) -> FakeGame:
+        if workflow_id == REGISTRY_ID and self.registry_running:
+            return None
+        game = self.games.get(workflow_id[len("trivia-game-"):]) if workflow_id.startswith("trivia-game-") else None
+        if game is None:
+            raise RPCError(f"workflow {workflow_id} not found", RPCStatusCode.NOT_FOUND, b"")
+        return game
+
+    def get_workflow_handle(self, workflow_id: str, **kwargs) -> FakeHandle:
+        return FakeHandle(self, workflow_id)
+
+    async def start_workflow(self, workflow: str, arg=None, *, id: str, **kwargs) -> FakeHandle:
+        await self.call(f"start:{workflow}")
+        if is_dataclass(arg):
+            arg = asdict(arg)
+        error = None
+        with self.lock:
+            if workflow == "TriviaGamesWorkflow":
+                if self.registry_running:
+                    raise WorkflowAlreadyStartedError(id, workflow)
+                self.registry_running = True
+            elif workflow == "TriviaGameWorkflow":
+                self.games[arg["GameId"]] = FakeGame(
+                    arg["GameId"],
+                    arg["NumberOfQuestions"],
+                    self.answer_limit if self.answer_limit is not None else arg["AnswerTimeLimit"],
+                    self.result_limit,
+                    time.monotonic() + self.question_delay,
+                    arg,
+                )
+            elif workflow == "AddPlayerWorkflow":
+                # Like the real workflow, failures surface from the result.
+                game = self.lookup(arg["GameWorkflowId"])
+                if arg["Player"] in game.players:
+                    error = WorkflowFailureError(cause=ApplicationError(f"Player {arg['Player']} already exists"))
+                elif len(game.players) >= arg["NumberOfPlayers"] or game.stage != "start":
+                    error = WorkflowFailureError(cause=ApplicationError("Game is full"))
+                else:
+                    game.players[arg["Player"]] = {"score": 0}
+            else:
+                raise ValueError(f"Unknown workflow {workflow}")
+        return FakeHandle(self, id, error)
+
+    async def execute_workflow(self, workflow: str, arg=None, *, id: str, **kwargs):
+        handle = await self.start_workflow(workflow, arg, id=id, **kwargs)
+        return await handle.result()
+
+
+def install(**kwargs) -> FakeTemporalClient:
+    """Make the UI's client pool hand out a fake client."""
+    import client
+
+    fake = FakeTemporalClient(**kwargs)
+
+    async def get() -> FakeTemporalClient:
+        return fake
+
+    client.pool.get = get
+    return fake
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve the UI against fake trivia workflows.")
+    parser.add_argument("--latency", type=float, default=0.005, help="simulated Temporal round trip in seconds")
+    parser.add_argument("--question-delay", type=float, default=2.0, help="seconds until a game's questions exist")
+    parser.add_argument("--result-time", type=float, default=5.0, help="seconds the result stage lasts")
+    parser.add_argument("--no-state-query", action="store_true", help="act like workers without getState")
+    parser.add_argument("--production", action="store_true", help="serve with serve.py instead of app.run")
+    args = parser.parse_args()
+
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    sys.path.insert(0, root)
+    os.chdir(root)
+    install(
+        latency=args.latency,
+        question_delay=args.question_delay,
+        result_limit=args.result_time,
+        state_query=not args.no_state_query,
+    )
+    if args.production:
+        import serve
+        sys.exit(serve.main())
+    from app import app
+
+    app.run(host=os.getenv("UI_HOST", "127.0.0.1"), port=int(os.getenv("UI_PORT", "5000")), threaded=True)
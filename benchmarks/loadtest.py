@@ -0,0 +1,217 @@
+"""Simulate concurrent trivia games against the UI with a fake Temporal.
+
+Runs the Flask app in-process with the Temporal client replaced by
+fake_temporal, then drives scripted players through a full game the way the
+browser pages do: create_game/join -> lobby -> start -> play/results for
+every question -> end, waiting on the game's event stream between pages.
+Reports latency per route, requests/s and Temporal calls per
+player-question.
+
+    $ poetry run python benchmarks/loadtest.py --games 20 --players 10 --questions 5
+"""
+from collections import defaultdict
+from typing import Callable, Dict, List, Optional
+import argparse
+import json
+import os
+import queue
+import random
+import sys
+import threading
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+os.chdir(ROOT)
+
+import fake_temporal  # noqa: E402
+
+
+class Stats:
+    def __init__(self) -> None:
+        self.lock = threading.Lock()
+        self.latencies: Dict[str, List[float]] = defaultdict(list)
+        self.errors: Dict[str, int] = defaultdict(int)
+        self.events = 0
+
+    def record(self, route: str, seconds: float, ok: bool) -> None:
+        with self.lock:
+            self.latencies[route].append(seconds)
+            if not ok:
+                self.errors[route] += 1
+
+
+class Player:
+    def __init__(self, app, stats: Stats, name: str, think: float, timeout: float) -> None:
+        self.client = app.test_client()
+        self.stats = stats
+        self.name = name
+        self.think = think
+        self.timeout = timeout
+
+    def request(self, route: str, method: str, path: str, **kwargs):
+        started = time.perf_counter()
+        response = self.client.open(path, method=method, **kwargs)
+        self.stats.record(route, time.perf_counter() - started, response.status_code < 400)
+        if response.status_code >= 400:
+            raise RuntimeError(f"{method} {path} returned {response.status_code}")
+        return response
+
+    def wait_for(self, game_id: str, done: Callable[[dict], bool]) -> dict:
+        """Follow the game's event stream until ``done`` accepts a state."""
+        started = time.perf_counter()
+        response = self.client.get(f"/{game_id}/events", buffered=False)
+        try:
+            buffer = ""
+            for chunk in response.response:
+                buffer += chunk.decode() if isinstance(chunk, bytes) else chunk
+                while "\n\n" in buffer:
+                    event, buffer = buffer.split("\n\n", 1)
+                    for line in event.splitlines():
+                        if line.startswith("data: "):
+                            state = json.loads(line[6:])
+                            with self.stats.lock:
+                                self.stats.events += 1
+                            if state.get("error") or done(state):
+                                self.stats.record("events (wait)", time.perf_counter() - started, not state.get("error"))
+                                return state
+                if time.perf_counter() - started > self.timeout:
+                    break
+        finally:
+            response.close()
+        raise RuntimeError(f"{self.name} timed out waiting on game {game_id}")
+
+    def play(self, game_id: str, players: int, questions: int, landing: str) -> None:
+        if landing == "lobby":
+            self.request("GET /<id>/lobby", "GET", f"/{game_id}/lobby")
+            self.request("GET /<id>/qr", "GET", f"/{game_id}/qr")
+            self.wait_for(game_id, lambda s: s.get("count", 0) >= players)
+
+        self.request("GET /<id>/start", "GET", f"/{game_id}/start")
+        self.wait_for(game_id, lambda s: s.get("ready"))
+
+        for question in range(1, questions + 1):
+            self.request("GET /<id>/play", "GET", f"/{game_id}/play")
+            self.request("GET /get_cname", "GET", "/get_cname")
+            time.sleep(random.uniform(0, self.think))
+            choice = random.choice(fake_temporal.CHOICES)
+            self.request("POST /<id>/play", "POST", f"/{game_id}/play", data={"choice": choice})
+            self.wait_for(game_id, lambda s: s["stage"] in ("result", "scores") or s["currentQuestion"] != question)
+
+            self.request("GET /<id>/<choice>/results", "GET", f"/{game_id}/{choice}/results")
+            self.request("GET /get_cname", "GET", "/get_cname")
+            self.wait_for(game_id, lambda s: (
+                (s["stage"] == "scores" and s["numberOfQuestions"] == question)
+                or (s["stage"] == "answers" and s["currentQuestion"] != question)
+            ))
+
+        self.request("GET /<id>/end", "GET", f"/{game_id}/end")
+
+
+def run_game(app, stats: Stats, index: int, args, failures: "queue.Queue[str]") -> None:
+    host = Player(app, stats, f"host{index}", args.think, args.timeout)
+    joined = threading.Event()
+    game: Dict[str, Optional[str]] = {"id": None}
+
+    def host_flow() -> None:
+        host.request("GET /create_game", "GET", "/create_game")
+        response = host.request("POST /create_game", "POST", "/create_game", data={
+            "player": host.name,
+            "mode": "casual",
+            "questions": str(args.questions),
+            "players": str(args.players),
+            "category": "random",
+        })
+        game["id"] = response.headers["Location"].split("/")[1]
+        joined.set()
+        landing = "start" if "/start" in response.headers["Location"] else "lobby"
+        host.play(game["id"], args.players, args.questions, landing)
+
+    def guest_flow(n: int) -> None:
+        guest = Player(app, stats, f"g{index}p{n}", args.think, args.timeout)
+        if not joined.wait(args.timeout) or game["id"] is None:
+            raise RuntimeError("game was never created")
+        game_id = game["id"]
+        guest.request("GET /<id>/join", "GET", f"/{game_id}/join")
+        response = guest.request("POST /<id>/join", "POST", f"/{game_id}/join", data={"player": guest.name})
+        landing = "start" if "/start" in response.headers.get("Location", "") else "lobby"
+        guest.play(game_id, args.players, args.questions, landing)
+
+    def guard(fn, *a) -> None:
+        try:
+            fn(*a)
+        except Exception as e:
+            failures.put(f"game {index}: {e}")
+            joined.set()
+
+    threads = [threading.Thread(target=guard, args=(host_flow,))]
+    threads += [threading.Thread(target=guard, args=(guest_flow, n)) for n in range(1, args.players)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+
+def percentile(values: List[float], p: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p))] * 1000
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--games", type=int, default=10)
+    parser.add_argument("--players", type=int, default=10, help="players per game")
+    parser.add_argument("--questions", type=int, default=3)
+    parser.add_argument("--think", type=float, default=1.0, help="max seconds a player takes to answer")
+    parser.add_argument("--latency", type=float, default=0.005, help="simulated Temporal round trip in seconds")
+    parser.add_argument("--result-time", type=float, default=1.0, help="seconds the result stage lasts")
+    parser.add_argument("--question-delay", type=float, default=1.0, help="seconds until a game's questions exist")
+    parser.add_argument("--timeout", type=float, default=60.0)
+    parser.add_argument("--no-state-query", action="store_true", help="workers without getState, for comparison")
+    args = parser.parse_args()
+
+    fake = fake_temporal.install(
+        latency=args.latency,
+        question_delay=args.question_delay,
+        result_limit=args.result_time,
+        state_query=not args.no_state_query,
+    )
+    from app import app
+
+    stats = Stats()
+    failures: "queue.Queue[str]" = queue.Queue()
+    started = time.perf_counter()
+    games = [
+        threading.Thread(target=run_game, args=(app, stats, i, args, failures))
+        for i in range(args.games)
+    ]
+    for g in games:
+        g.start()
+    for g in games:
+        g.join()
+    elapsed = time.perf_counter() - started
+
+    requests = sum(len(v) for r, v in stats.latencies.items() if r != "events (wait)")
+    player_questions = args.games * args.players * args.questions
+    print(f"{args.games} games x {args.players} players x {args.questions} questions in {elapsed:.1f}s, "
+          f"{requests} requests ({requests / elapsed:.0f} req/s), {stats.events} stream events")
+    print(f"{'route':<28}{'count':>8}{'p50 ms':>10}{'p99 ms':>10}{'errors':>8}")
+    for route in sorted(stats.latencies):
+        values = stats.latencies[route]
+        print(f"{route:<28}{len(values):>8}{percentile(values, 0.5):>10.1f}{percentile(values, 0.99):>10.1f}{stats.errors[route]:>8}")
+
+    total_calls = sum(fake.calls.values())
+    print(f"\nTemporal calls: {total_calls}, {total_calls / player_questions:.2f} per player-question")
+    for kind, count in fake.calls.most_common():
+        print(f"  {kind:<34}{count:>8}{count / player_questions:>10.2f}")
+
+    failed = 0
+    while not failures.empty():
+        failed += 1
+        print(f"FAILED {failures.get()}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,18 +1,72 @@
+from background import background
+from metrics import MetricsInterceptor, profiler
 from temporalio.client import Client, TLSConfig
-from typing import Optional
+from temporalio.converter import DataConverter
+from workflow import message_converter
+from typing import Optional, Tuple
+import asyncio
+import concurrent.futures
+import dataclasses
 import os
+import random
+import threading
+import time
 
-async def get_client()-> Client:
 
+def _cert_paths() -> Optional[Tuple[str, str]]:
     if (
         os.getenv("TEMPORAL_MTLS_TLS_CERT")
         and os.getenv("TEMPORAL_MTLS_TLS_KEY") is not None
     ):
+        return os.getenv("TEMPORAL_MTLS_TLS_CERT"), os.getenv("TEMPORAL_MTLS_TLS_KEY")
+    return None
+
+
+def _cert_stamp() -> Optional[Tuple]:
+    # (mtime, size) of the cert and key, so a rotated secret is noticed without
+    # reading the files on every request.
+    paths = _cert_paths()
+    if paths is None:
+        return None
+    stamp = []
+    for path in paths:
+        st = os.stat(path)
+        stamp.append((st.st_mtime_ns, st.st_size))
+    return tuple(stamp)
+
+
+def _data_converter() -> DataConverter:
+    """The message converter with the codecs in TEMPORAL_PAYLOAD_CODECS.
+
+    A comma separated list of ``compression`` and ``encryption``, applied in
+    that order when encoding. Workers must be configured with the same chain.
+    """
+    names = [n.strip() for n in os.getenv("TEMPORAL_PAYLOAD_CODECS", "").split(",") if n.strip()]
+    if not names:
+        return message_converter
+
+    from encryption_codec import CodecChain, CompressionCodec, EncryptionCodec
+
+    codecs = []
+    for name in names:
+        if name == "compression":
+            codecs.append(CompressionCodec(threshold=int(os.getenv("TEMPORAL_COMPRESSION_THRESHOLD", "1024"))))
+        elif name == "encryption":
+            codecs.append(EncryptionCodec())
+        else:
+            raise ValueError(f"Unknown payload codec {name!r} in TEMPORAL_PAYLOAD_CODECS")
+    codec = codecs[0] if len(codecs) == 1 else CodecChain(*codecs)
+    return dataclasses.replace(message_converter, payload_codec=codec)
+
+
+async def _connect() -> Client:
+    paths = _cert_paths()
+    if paths is not None:
         server_root_ca_cert: Optional[bytes] = None
-        with open(os.getenv("TEMPORAL_MTLS_TLS_CERT"), "rb") as f:
+        with open(paths[0], "rb") as f:
             client_cert = f.read()
 
-        with open(os.getenv("TEMPORAL_MTLS_TLS_KEY"), "rb") as f:
+        with open(paths[1], "rb") as f:
             client_key = f.read()
 
         # Start client
@@ -24,13 +78,147 @@ async def get_client()-> Client:
                 client_cert=client_cert,
                 client_private_key=client_key,
             ),
-            #data_converter=dataclasses.replace(
-            #    temporalio.converter.default(), payload_codec=EncryptionCodec()
-            #),            
+            interceptors=[MetricsInterceptor()],
+            data_converter=_data_converter(),
         )
     else:
         client = await Client.connect(
             "localhost:7233",
+            interceptors=[MetricsInterceptor()],
+            data_converter=_data_converter(),
         )
 
-    return client       
\ No newline at end of file
+    return client
+
+
+class ClientPool:
+    """Hands out one lazily connected Temporal client per worker process.
+
+    The client is shared by every request (and every event loop) in the
+    process. Concurrent callers during the first connect wait on the same
+    attempt, failed connects are retried with exponential backoff and the mTLS
+    cert/key are only re-read when they change on disk.
+    """
+
+    def __init__(
+        self,
+        max_attempts: int = 5,
+        initial_backoff: float = 0.2,
+        max_backoff: float = 5.0,
+        cert_check_interval: float = 10.0,
+    ) -> None:
+        self.max_attempts = max_attempts
+        self.initial_backoff = initial_backoff
+        self.max_backoff = max_backoff
+        self.cert_check_interval = cert_check_interval
+
+        self._lock = threading.Lock()
+        self._client: Optional[Client] = None
+        self._cert_stamp: Optional[Tuple] = None
+        self._cert_checked_at = 0.0
+        self._connecting: Optional[concurrent.futures.Future] = None
+
+        self.connect_count = 0
+        self.connect_failures = 0
+        self.connect_seconds_total = 0.0
+        self.last_connect_seconds = 0.0
+
+    async def get(self) -> Client:
+        now = time.monotonic()
+        with self._lock:
+            client = self._client
+            if client is not None and now - self._cert_checked_at < self.cert_check_interval:
+                return client
+
+        stamp = _cert_stamp()
+        with self._lock:
+            if self._client is not None and stamp == self._cert_stamp:
+                self._cert_checked_at = now
+                return self._client
+            if self._client is not None:
+                print("Temporal client certificates changed on disk, reconnecting...")
+            pending = self._connecting
+            if pending is None:
+                pending = self._connecting = concurrent.futures.Future()
+                owner = True
+            else:
+                owner = False
+
+        # Only one caller connects, everybody else (possibly on another event
+        # loop) waits for its result.
+        if not owner:
+            return await asyncio.shield(asyncio.wrap_future(pending))
+
+        try:
+            client = await self._connect_with_backoff()
+        except BaseException as e:
+            with self._lock:
+                self._connecting = None
+            pending.set_exception(e)
+            raise
+
+        with self._lock:
+            self._client = client
+            self._cert_stamp = stamp
+            self._cert_checked_at = time.monotonic()
+            self._connecting = None
+        pending.set_result(client)
+        return client
+
+    def invalidate(self) -> None:
+        """Drop the pooled client so the next caller reconnects."""
+        with self._lock:
+            self._client = None
+            self._cert_stamp = None
+
+    @property
+    def connected(self) -> bool:
+        return self._client is not None
+
+    def warm(self) -> None:
+        """Connect on the background loop so the first request doesn't wait for it."""
+        def done(future: concurrent.futures.Future) -> None:
+            if future.exception() is not None:
+                print(f"Temporal client warm-up failed, requests will retry: {future.exception()}")
+
+        background.submit(self.get()).add_done_callback(done)
+
+    def stats(self) -> dict:
+        return {
+            "connects": self.connect_count,
+            "connect_failures": self.connect_failures,
+            "connect_seconds_total": self.connect_seconds_total,
+            "last_connect_seconds": self.last_connect_seconds,
+        }
+
+    async def _connect_with_backoff(self) -> Client:
+        backoff = self.initial_backoff
+        for attempt in range(1, self.max_attempts + 1):
+            started = time.perf_counter()
+            try:
+                client = await _connect()
+            except Exception as e:
+                self.connect_failures += 1
+                if attempt == self.max_attempts:
+                    print(f"Failed to connect to Temporal after {attempt} attempts: {e}")
+                    raise
+                delay = random.uniform(0, backoff)
+                print(f"Failed to connect to Temporal (attempt {attempt}), retrying in {delay:.2f}s: {e}")
+                await asyncio.sleep(delay)
+                backoff = min(backoff * 2, self.max_backoff)
+                continue
+
+            elapsed = time.perf_counter() - started
+            profiler.span("connect", elapsed)
+            self.connect_count += 1
+            self.connect_seconds_total += elapsed
+            self.last_connect_seconds = elapsed
+            print(f"Connected to Temporal in {elapsed:.3f}s (connect #{self.connect_count})")
+            return client
+
+
+pool = ClientPool()
+
+
+async def get_client()-> Client:
+    return await pool.get()
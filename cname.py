@@ -0,0 +1,99 @@
+from background import Refresher
+from typing import Optional
+from urllib.parse import urlparse
+import concurrent.futures
+import os
+import threading
+import time
+
+
+class CNAMEResolver:
+    """CNAME of a host, resolved on the background loop and served from memory.
+
+    The record is looked up once and then refreshed by a single task when its
+    TTL (clamped to ``min_ttl``/``max_ttl``) runs out. Missing records and
+    failed lookups are remembered for ``negative_ttl`` seconds. The refresh
+    task stops after ``idle_timeout`` seconds without readers.
+    """
+
+    def __init__(
+        self,
+        hostname: Optional[str],
+        min_ttl: float = 5.0,
+        max_ttl: float = 300.0,
+        negative_ttl: float = 30.0,
+        timeout: float = 3.0,
+        idle_timeout: float = 300.0,
+    ) -> None:
+        self.hostname = hostname
+        self.min_ttl = min_ttl
+        self.max_ttl = max_ttl
+        self.negative_ttl = negative_ttl
+        self.timeout = timeout
+        self.idle_timeout = idle_timeout
+
+        self._lock = threading.Lock()
+        self._cname: Optional[str] = None
+        self._expires_at: Optional[float] = None
+        self._read_at = 0.0
+        # Looked up again when the record expires, while it's being read.
+        self._lookups = Refresher(
+            self._resolve,
+            f"resolve {hostname}",
+            interval=lambda: max((self._expires_at or 0) - time.monotonic(), 0.1),
+            active=lambda: time.monotonic() - self._read_at < self.idle_timeout,
+        )
+
+    async def get(self) -> Optional[str]:
+        if not self.hostname:
+            return None
+        with self._lock:
+            self._read_at = time.monotonic()
+            cname, resolved = self._cname, self._expires_at is not None
+        self._lookups.keep()
+        if resolved:
+            return cname
+        # Only the very first readers wait for DNS.
+        await self._lookups.wait()
+        return self._cname
+
+    def resolve(self) -> concurrent.futures.Future:
+        """Start a lookup on the background loop, or join the running one."""
+        return self._lookups.refresh()
+
+    async def _resolve(self) -> None:
+        # dnspython takes a while to import, load it with the first lookup.
+        import dns.asyncresolver
+        import dns.exception
+        import dns.resolver
+
+        cname = None
+        ttl = self.negative_ttl
+        try:
+            answer = await dns.asyncresolver.resolve(self.hostname, 'CNAME', lifetime=self.timeout)
+            for rdata in answer:
+                cname = str(rdata.target)
+            ttl = min(max(answer.rrset.ttl, self.min_ttl), self.max_ttl)
+        except dns.resolver.NoAnswer:
+            self._log_change(cname, f'No CNAME record found for {self.hostname}')
+        except dns.resolver.NXDOMAIN:
+            self._log_change(cname, f'No such domain {self.hostname}')
+        except dns.exception.Timeout:
+            self._log_change(cname, f'Timeout while querying {self.hostname}')
+        except Exception as e:
+            self._log_change(cname, f'Error occurred: {e}')
+
+        with self._lock:
+            self._cname = cname
+            self._expires_at = time.monotonic() + ttl
+
+    def _log_change(self, cname: Optional[str], message: str) -> None:
+        # Failures repeat every negative_ttl, only report the first one.
+        if self._expires_at is None or self._cname != cname:
+            print(message)
+
+
+temporal_cname = CNAMEResolver(
+    urlparse('//' + os.getenv("TEMPORAL_HOST_URL", "")).hostname,
+    negative_ttl=float(os.getenv("CNAME_NEGATIVE_TTL", "30")),
+)
@@ -0,0 +1,109 @@
+from background import Refresher
+from client import get_client
+from queries import GameNotFound, query_state, query_workflow
+from registry import game_registry
+from typing import Dict, Optional
+import asyncio
+import concurrent.futures
+import os
+import threading
+import time
+
+
+class GameDirectory:
+    """Materialized snapshot of the active games shown on the index page.
+
+    A refresh lists games from the registry workflow and queries every game
+    concurrently (bounded by ``concurrency``, each capped at ``game_timeout``).
+    Games that don't answer keep their last known entry. While the index is
+    being viewed, the snapshot is refreshed every ``interval`` seconds on the
+    background loop so page loads are served from memory.
+    """
+
+    def __init__(
+        self,
+        interval: float = 2.0,
+        max_age: float = 10.0,
+        idle_timeout: float = 300.0,
+        concurrency: int = 16,
+        game_timeout: float = 3.0,
+    ) -> None:
+        self.interval = interval
+        self.max_age = max_age
+        self.idle_timeout = idle_timeout
+        self.concurrency = concurrency
+        self.game_timeout = game_timeout
+
+        self._lock = threading.Lock()
+        self._games: Dict[str, dict] = {}
+        self._refreshed_at: Optional[float] = None
+        self._viewed_at = 0.0
+        self._refreshes = Refresher(
+            self._refresh,
+            "refresh game list",
+            interval=lambda: self.interval,
+            active=lambda: time.monotonic() - self._viewed_at < self.idle_timeout,
+        )
+
+    async def get(self) -> Dict[str, dict]:
+        with self._lock:
+            self._viewed_at = time.monotonic()
+            fresh = self._refreshed_at is not None and time.monotonic() - self._refreshed_at < self.max_age
+            games = self._games
+        self._refreshes.keep()
+        if fresh:
+            return games
+        await self._refreshes.wait()
+        return self._games
+
+    def refresh(self) -> concurrent.futures.Future:
+        """Start a refresh on the background loop, or join the running one."""
+        return self._refreshes.refresh()
+
+    async def _refresh(self) -> None:
+        started = time.perf_counter()
+        client = await get_client()
+        registry = client.get_workflow_handle(game_registry.workflow_id)
+        try:
+            game_ids = list(await query_workflow(registry, "getGames", allow_empty=True))
+        except GameNotFound:
+            # Gone since it was last ensured, start it again now.
+            game_registry.invalidate()
+            await game_registry.ensure()
+            game_ids = []
+
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def load(game_id: str) -> dict:
+            async with semaphore:
+                handle = client.get_workflow_handle(f'trivia-game-{game_id}')
+                state = await asyncio.wait_for(
+                    query_state(handle, require=("players",), attempts=3),
+                    self.game_timeout,
+                )
+                return {"users": list(state["players"]), "started": state["progress"]["stage"] != "start"}
+
+        results = await asyncio.gather(*(load(g) for g in game_ids), return_exceptions=True)
+
+        games: Dict[str, dict] = {}
+        missing = 0
+        for game_id, result in zip(game_ids, results):
+            if isinstance(result, GameNotFound):
+                continue
+            if isinstance(result, BaseException):
+                # Partial result, show what we knew last time if anything.
+                missing += 1
+                if game_id in self._games:
+                    games[game_id] = self._games[game_id]
+                continue
+            games[game_id] = result
+
+        with self._lock:
+            self._games = games
+            self._refreshed_at = time.monotonic()
+
+        if missing:
+            print(f"Game list refreshed in {time.perf_counter() - started:.3f}s, {missing} of {len(game_ids)} games did not answer")
+
+
+game_directory = GameDirectory(interval=float(os.getenv("GAME_LIST_REFRESH", "2.0")))
@@ -1,58 +1,186 @@
-import base64
+import asyncio
 import os
-from typing import Iterable, List
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from typing import TYPE_CHECKING, Dict, Iterable, List, Mapping, Optional, Sequence
 
-from cryptography.hazmat.primitives.ciphers.aead import AESGCM
 from temporalio.api.common.v1 import Payload
 from temporalio.converter import PayloadCodec
 
+if TYPE_CHECKING:
+    from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+
 default_key = b"sa-rocks!sa-rocks!sa-rocks!yeah!"
 default_key_id = "c2EtZGVtby1rZXk="
 
+ENCRYPTED_ENCODING = b"binary/encrypted"
+COMPRESSED_ENCODING = b"binary/zlib"
+
+
+class _BatchCodec(PayloadCodec):
+    """Runs a codec's work inline, or split across a thread pool for big batches."""
 
-class EncryptionCodec(PayloadCodec):
-    def __init__(self, key_id: str = default_key_id, key: bytes = default_key) -> None:
+    def __init__(self, parallel_threshold: int, max_workers: Optional[int]) -> None:
         super().__init__()
+        self.parallel_threshold = parallel_threshold
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+    async def _run(self, fn, payloads: List[Payload]) -> List[Payload]:
+        size = sum(p.ByteSize() for p in payloads)
+        if size < self.parallel_threshold:
+            return fn(payloads)
+
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(self.max_workers, thread_name_prefix="trivia-codec")
+        loop = asyncio.get_running_loop()
+        # One chunk per thread, results come back in order.
+        chunk = -(-len(payloads) // self.max_workers)
+        parts = await asyncio.gather(*(
+            loop.run_in_executor(self._executor, fn, payloads[i:i + chunk])
+            for i in range(0, len(payloads), chunk)
+        ))
+        return [p for part in parts for p in part]
+
+
+class EncryptionCodec(_BatchCodec):
+    """AES-GCM payload codec.
+
+    Payloads are encrypted with ``key_id``. Payloads encrypted with any key in
+    ``previous_keys`` (key id to key) still decrypt, so keys can be rotated
+    without breaking running workflows. Batches larger than
+    ``parallel_threshold`` bytes are split across a thread pool, which keeps
+    the event loop free (OpenSSL releases the GIL while it works).
+    """
+
+    def __init__(
+        self,
+        key_id: str = default_key_id,
+        key: bytes = default_key,
+        previous_keys: Optional[Mapping[str, bytes]] = None,
+        parallel_threshold: int = 1024 * 1024,
+        max_workers: Optional[int] = None,
+    ) -> None:
+        # Only loaded once a codec is configured, it's slow to import.
+        from cryptography.hazmat.primitives.ciphers import aead
+
+        super().__init__(parallel_threshold, max_workers)
         self.key_id = key_id
         # We are using direct AESGCM to be compatible with samples from
         # TypeScript and Go. Pure Python samples may prefer the higher-level,
         # safer APIs.
-        self.encryptor = AESGCM(key)
+        self.encryptor = aead.AESGCM(key)
+        self.decryptors: Dict[bytes, "AESGCM"] = {
+            k.encode(): aead.AESGCM(v) for k, v in (previous_keys or {}).items()
+        }
+        self.decryptors[key_id.encode()] = self.encryptor
+        self._metadata = {
+            "encoding": ENCRYPTED_ENCODING,
+            "encryption-key-id": key_id.encode(),
+        }
 
     async def encode(self, payloads: Iterable[Payload]) -> List[Payload]:
         # We blindly encode all payloads with the key and set the metadata
         # saying which key we used
-        return [
-            Payload(
-                metadata={
-                    "encoding": b"binary/encrypted",
-                    "encryption-key-id": self.key_id.encode(),
-                },
-                data=self.encrypt(p.SerializeToString()),
+        return await self._run(self._encode, list(payloads))
+
+    async def decode(self, payloads: Iterable[Payload]) -> List[Payload]:
+        return await self._run(self._decode, list(payloads))
+
+    def encrypt(self, data: bytes) -> bytes:
+        nonce = os.urandom(12)
+        return nonce + self.encryptor.encrypt(nonce, data, None)
+
+    def decrypt(self, data: bytes, key_id: Optional[bytes] = None) -> bytes:
+        if key_id is None:
+            key_id = self.key_id.encode()
+        decryptor = self.decryptors.get(key_id)
+        if decryptor is None:
+            raise ValueError(
+                f"Unrecognized key ID {key_id.decode()}. Current key ID is {self.key_id}."
             )
+        # Slicing a memoryview doesn't copy the ciphertext.
+        view = memoryview(data)
+        return decryptor.decrypt(view[:12], view[12:], None)
+
+    def _encode(self, payloads: Sequence[Payload]) -> List[Payload]:
+        return [
+            Payload(metadata=self._metadata, data=self.encrypt(p.SerializeToString()))
             for p in payloads
         ]
 
-    async def decode(self, payloads: Iterable[Payload]) -> List[Payload]:
+    def _decode(self, payloads: Sequence[Payload]) -> List[Payload]:
         ret: List[Payload] = []
         for p in payloads:
             # Ignore ones w/out our expected encoding
-            if p.metadata.get("encoding", b"").decode() != "binary/encrypted":
+            if p.metadata.get("encoding") != ENCRYPTED_ENCODING:
                 ret.append(p)
                 continue
-            # Confirm our key ID is the same
-            key_id = p.metadata.get("encryption-key-id", b"").decode()
-            if key_id != self.key_id:
-                raise ValueError(
-                    f"Unrecognized key ID {key_id}. Current key ID is {self.key_id}."
-                )
-            # Decrypt and append
-            ret.append(Payload.FromString(self.decrypt(p.data)))
+            key_id = p.metadata.get("encryption-key-id", b"")
+            ret.append(Payload.FromString(self.decrypt(p.data, key_id)))
         return ret
 
-    def encrypt(self, data: bytes) -> bytes:
-        nonce = os.urandom(12)
-        return nonce + self.encryptor.encrypt(nonce, data, None)
 
-    def decrypt(self, data: bytes) -> bytes:
-        return self.encryptor.decrypt(data[:12], data[12:], None)
\ No newline at end of file
+class CompressionCodec(_BatchCodec):
+    """zlib payload codec, for big payloads like a game's questions.
+
+    Payloads smaller than ``threshold`` bytes, or that don't get smaller,
+    are passed through untouched. Chain it before encryption (encrypted
+    data doesn't compress): ``CodecChain(CompressionCodec(), EncryptionCodec())``.
+    """
+
+    def __init__(
+        self,
+        threshold: int = 1024,
+        level: int = 6,
+        parallel_threshold: int = 1024 * 1024,
+        max_workers: Optional[int] = None,
+    ) -> None:
+        super().__init__(parallel_threshold, max_workers)
+        self.threshold = threshold
+        self.level = level
+        self._metadata = {"encoding": COMPRESSED_ENCODING}
+
+    async def encode(self, payloads: Iterable[Payload]) -> List[Payload]:
+        return await self._run(self._encode, list(payloads))
+
+    async def decode(self, payloads: Iterable[Payload]) -> List[Payload]:
+        return await self._run(self._decode, list(payloads))
+
+    def _encode(self, payloads: Sequence[Payload]) -> List[Payload]:
+        ret: List[Payload] = []
+        for p in payloads:
+            size = p.ByteSize()
+            if size < self.threshold:
+                ret.append(p)
+                continue
+            data = zlib.compress(p.SerializeToString(), self.level)
+            ret.append(Payload(metadata=self._metadata, data=data) if len(data) < size else p)
+        return ret
+
+    def _decode(self, payloads: Sequence[Payload]) -> List[Payload]:
+        return [
+            Payload.FromString(zlib.decompress(p.data))
+            if p.metadata.get("encoding") == COMPRESSED_ENCODING else p
+            for p in payloads
+        ]
+
+
+class CodecChain(PayloadCodec):
+    """Applies codecs in order when encoding and in reverse when decoding."""
+
+    def __init__(self, *codecs: PayloadCodec) -> None:
+        super().__init__()
+        self.codecs = codecs
+
+    async def encode(self, payloads: Iterable[Payload]) -> List[Payload]:
+        payloads = list(payloads)
+        for codec in self.codecs:
+            payloads = await codec.encode(payloads)
+        return payloads
+
+    async def decode(self, payloads: Iterable[Payload]) -> List[Payload]:
+        payloads = list(payloads)
+        for codec in reversed(self.codecs):
+            payloads = await codec.decode(payloads)
+        return payloads
@@ -0,0 +1,347 @@
+from background import background
+from client import get_client
+from queries import GameNotFound, GameUnavailable, query_state
+from rendering import etag_of, json_encode
+from store import game_store
+from typing import AsyncIterator, Callable, Dict, Iterator, List, Optional, Tuple
+import asyncio
+import itertools
+import json
+import os
+import threading
+import time
+
+# Longest a /<game_id>/state request may wait for a change.
+LONG_POLL_TIMEOUT = 30
+
+
+class GameWatcher:
+    """Tracks the state of one game on behalf of all its subscribers.
+
+    A single watcher polls the game workflow on the background loop and
+    publishes a new versioned snapshot whenever the state changes. Readers in
+    request threads block on ``wait`` until the version moves past theirs,
+    readers on an event loop await ``wait_async`` instead.
+    The compact form for ``/<game_id>/state`` and the answers to the pages'
+    polls (see ``encoded``) are encoded once per version.
+    """
+
+    def __init__(self, game_id: str, hub: "GameEvents") -> None:
+        self.game_id = game_id
+        self.hub = hub
+        self.subscribers = 0
+        self.state: Optional[dict] = None
+        self.compact: Optional[str] = None
+        self.version = 0
+        self.closed = False
+        self.questions_ready = False
+        # Poll name -> (body, etag) for the current version.
+        self._encoded: Dict[str, Tuple[bytes, str]] = {}
+
+        self._cond = threading.Condition()
+        self._wakeup: Optional[asyncio.Event] = None
+        # Futures of wait_async callers, resolved on their own loops.
+        self._waiters: List[Tuple[asyncio.AbstractEventLoop, asyncio.Future]] = []
+
+    def wait(self, seen: int, timeout: float) -> Tuple[Optional[dict], int]:
+        with self._cond:
+            self._cond.wait_for(lambda: (self.state is not None and self.version != seen) or self.closed, timeout)
+            return self.state, self.version
+
+    async def wait_async(self, seen: int, timeout: float) -> Tuple[Optional[dict], int]:
+        """Like ``wait`` without holding a thread."""
+        loop = asyncio.get_running_loop()
+        with self._cond:
+            if (self.state is not None and self.version != seen) or self.closed:
+                return self.state, self.version
+            waiter = (loop, loop.create_future())
+            self._waiters.append(waiter)
+        try:
+            await asyncio.wait_for(waiter[1], timeout)
+        except asyncio.TimeoutError:
+            pass
+        finally:
+            with self._cond:
+                if waiter in self._waiters:
+                    self._waiters.remove(waiter)
+        with self._cond:
+            return self.state, self.version
+
+    def _notify(self) -> None:
+        # Called with _cond held.
+        self._cond.notify_all()
+        for loop, future in self._waiters:
+            try:
+                loop.call_soon_threadsafe(_resolve, future)
+            except RuntimeError:
+                pass  # The loop is closed, nobody is waiting there anymore.
+        self._waiters = []
+
+    def latest(self) -> Tuple[Optional[dict], Optional[str]]:
+        with self._cond:
+            return self.state, self.compact
+
+    def encoded(self, name: str, build: Callable[[dict], dict]) -> Optional[Tuple[bytes, str]]:
+        """``build(state)`` as JSON with its ETag, encoded once per version.
+
+        None until the game has been polled, if polling it failed or if
+        ``build`` can't answer from the state.
+        """
+        with self._cond:
+            if self.state is None or self.state.get("error"):
+                return None
+            body = self._encoded.get(name)
+            if body is None:
+                value = build(self.state)
+                if value is None:
+                    return None
+                data = json_encode(value).encode()
+                body = self._encoded[name] = (data, etag_of(data))
+            return body
+
+    def poke(self) -> None:
+        """Poll again now instead of at the next interval."""
+        if self._wakeup is not None:
+            background.call_soon(self._wakeup.set)
+
+    def close(self) -> None:
+        with self._cond:
+            self.closed = True
+            self._notify()
+        self.poke()
+
+    def publish(self, state: dict) -> None:
+        with self._cond:
+            if state == self.state:
+                return
+            self.version = next(self.hub.versions)
+            self.state = state
+            self.compact = json.dumps(compact_state(state, self.version))
+            self._encoded = {}
+            self._notify()
+
+    async def run(self) -> None:
+        try:
+            await self._watch()
+        except Exception as e:
+            print(f"Watcher for game {self.game_id} stopped: {e}")
+        finally:
+            self.hub.retire(self, force=True)
+            self.close()
+
+    async def _watch(self) -> None:
+        self._wakeup = asyncio.Event()
+        client = await get_client()
+        handle = client.get_workflow_handle(f'trivia-game-{self.game_id}')
+        idle_since = None
+        while not self.closed:
+            if not self.hub.keep(self):
+                if idle_since is None:
+                    idle_since = time.monotonic()
+                elif time.monotonic() - idle_since > self.hub.idle_grace:
+                    if self.hub.retire(self):
+                        return
+            else:
+                idle_since = None
+
+            try:
+                self.publish(await self.poll(handle))
+            except GameNotFound:
+                self.publish({"error": "not_found"})
+                return
+            except GameUnavailable:
+                pass
+            except Exception as e:
+                print(f"Watcher for game {self.game_id} failed to poll: {e}")
+
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self.hub.interval)
+            except asyncio.TimeoutError:
+                pass
+
+    async def poll(self, handle) -> dict:
+        state = await query_state(handle, questions=not self.questions_ready, attempts=2, deadline=5)
+        progress, players = state["progress"], state["players"]
+        if not self.questions_ready:
+            self.questions_ready = bool(state["questions"])
+        # Joins in flight and rejected joins, the lobby shows their outcome.
+        game = await game_store.get_async(self.game_id) or {}
+
+        return {
+            "stage": progress["stage"],
+            "currentQuestion": progress.get("currentQuestion"),
+            "numberOfQuestions": progress.get("numberOfQuestions"),
+            "players": list(players),
+            "count": len(players),
+            "scores": {p: v.get("score") for p, v in players.items()} if isinstance(players, dict) else {},
+            "ready": self.questions_ready,
+            "joining": sorted(game.get("joining", {})),
+            "rejected": game.get("rejected", {}),
+            "numberOfPlayers": game.get("number_players"),
+        }
+
+
+def _resolve(future: asyncio.Future) -> None:
+    if not future.done():
+        future.set_result(None)
+
+
+def compact_state(state: dict, version: int) -> dict:
+    """What pollers of ``/<game_id>/state`` get, enough to decide when to move on."""
+    if state.get("error"):
+        return {"version": version, "error": state["error"]}
+    return {
+        "version": version,
+        "stage": state["stage"],
+        "currentQuestion": state["currentQuestion"],
+        "numberOfQuestions": state["numberOfQuestions"],
+        "count": state["count"],
+        "numberOfPlayers": state["numberOfPlayers"],
+        "full": state["numberOfPlayers"] is not None and state["count"] >= state["numberOfPlayers"],
+        "ready": state["ready"],
+        "results": state["stage"] == "result",
+    }
+
+
+class GameEvents:
+    """One watcher per game, fanned out to every connected browser."""
+
+    def __init__(
+        self,
+        interval: float = 1.0,
+        idle_grace: float = 10.0,
+        heartbeat: float = 15.0,
+        max_stream_age: float = 30.0,
+    ) -> None:
+        self.interval = interval
+        self.idle_grace = idle_grace
+        self.heartbeat = heartbeat
+        self.max_stream_age = max_stream_age
+        self._lock = threading.Lock()
+        self._watchers: Dict[str, GameWatcher] = {}
+        # Shared by all watchers so a game's version keeps growing even
+        # when its watcher is replaced; seeded from the clock for restarts.
+        self.versions = itertools.count(int(time.time() * 1000))
+
+    def subscribe(self, game_id: str) -> GameWatcher:
+        with self._lock:
+            watcher = self._watchers.get(game_id)
+            if watcher is None:
+                watcher = self._watchers[game_id] = GameWatcher(game_id, self)
+                background.submit(watcher.run())
+            watcher.subscribers += 1
+            return watcher
+
+    def unsubscribe(self, watcher: GameWatcher) -> None:
+        with self._lock:
+            watcher.subscribers -= 1
+
+    def keep(self, watcher: GameWatcher) -> bool:
+        with self._lock:
+            return watcher.subscribers > 0
+
+    def retire(self, watcher: GameWatcher, force: bool = False) -> bool:
+        # Done under the lock so a concurrent subscribe either finds the
+        # watcher still running or creates a new one.
+        with self._lock:
+            if watcher.subscribers > 0 and not force:
+                return False
+            if self._watchers.get(watcher.game_id) is watcher:
+                del self._watchers[watcher.game_id]
+            return True
+
+    def watching(self, game_id: str) -> Optional[GameWatcher]:
+        """The game's watcher if one is running, without starting one."""
+        with self._lock:
+            watcher = self._watchers.get(game_id)
+        return watcher if watcher is not None and not watcher.closed else None
+
+    def poke(self, game_id: str) -> None:
+        with self._lock:
+            watcher = self._watchers.get(game_id)
+        if watcher is not None:
+            watcher.poke()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "watchers": len(self._watchers),
+                "subscribers": sum(w.subscribers for w in self._watchers.values()),
+            }
+
+    def close(self) -> None:
+        """End every open stream, e.g. on shutdown."""
+        with self._lock:
+            watchers = list(self._watchers.values())
+            self._watchers.clear()
+        for watcher in watchers:
+            watcher.close()
+
+    def snapshot(self, game_id: str, since: int, timeout: float) -> Tuple[Optional[dict], Optional[str]]:
+        """Long-poll: the game's state once its version isn't ``since`` anymore.
+
+        Returns the full and the compact (JSON encoded) state, the current
+        ones if nothing changed within ``timeout``, or None if the game
+        hasn't been polled yet.
+        """
+        watcher = self.subscribe(game_id)
+        try:
+            watcher.wait(since, timeout)
+            return watcher.latest()
+        finally:
+            self.unsubscribe(watcher)
+
+    async def snapshot_async(self, game_id: str, since: int, timeout: float) -> Tuple[Optional[dict], Optional[str]]:
+        """Like ``snapshot``, waiting on the caller's event loop."""
+        watcher = self.subscribe(game_id)
+        try:
+            await watcher.wait_async(since, timeout)
+            return watcher.latest()
+        finally:
+            self.unsubscribe(watcher)
+
+    def stream(self, game_id: str) -> Iterator[str]:
+        """Server-sent events for a game, one per state change.
+
+        WSGI servers don't tell a response that its client went away, so
+        streams end after ``max_stream_age`` seconds and browsers reconnect.
+        serve.py streams with ``stream_async`` instead (see streams.py).
+        """
+        watcher = self.subscribe(game_id)
+        try:
+            seen = 0
+            ends_at = time.monotonic() + self.max_stream_age
+            yield "retry: 2000\n\n"
+            while time.monotonic() < ends_at:
+                state, version = watcher.wait(seen, min(self.heartbeat, max(ends_at - time.monotonic(), 0)))
+                if version == seen:
+                    if watcher.closed:
+                        return
+                    yield ": keepalive\n\n"
+                    continue
+                seen = version
+                yield f"id: {version}\ndata: {json.dumps(state)}\n\n"
+        finally:
+            self.unsubscribe(watcher)
+
+    async def stream_async(self, game_id: str) -> AsyncIterator[str]:
+        """Like ``stream`` without holding a thread, until the caller stops it."""
+        watcher = self.subscribe(game_id)
+        try:
+            seen = 0
+            yield "retry: 2000\n\n"
+            while True:
+                state, version = await watcher.wait_async(seen, self.heartbeat)
+                if version == seen:
+                    if watcher.closed:
+                        return
+                    yield ": keepalive\n\n"
+                    continue
+                seen = version
+                yield f"id: {version}\ndata: {json.dumps(state)}\n\n"
+        finally:
+            self.unsubscribe(watcher)
+
+
+game_events = GameEvents(interval=float(os.getenv("GAME_WATCH_INTERVAL", "1.0")))
@@ -0,0 +1,115 @@
+from background import Refresher, background
+from client import get_client
+from metrics import metrics
+from qr import qr_codes
+from queries import query_cache, query_state
+from questions import question_cache
+from store import game_store
+from typing import Dict
+from workflow import TriviaWorkflowInput
+import asyncio
+import concurrent.futures
+import os
+import threading
+import time
+
+
+class GameEvictor:
+    """Bounds the game state a long running worker holds.
+
+    Every ``interval`` seconds the game store drops games idle for longer
+    than its TTL and the least recently used games above its limits. Whenever
+    the store evicts a game, the questions, QR code and query results cached
+    for it go too. A player coming back to an evicted game gets it rebuilt
+    from the workflow by ``restore``.
+    """
+
+    def __init__(self, interval: float = 30.0) -> None:
+        self.interval = interval
+        self.evicted = 0
+
+        self._lock = threading.Lock()
+        self._sweeps = Refresher(self._sweep, "sweep the game store", interval=lambda: self.interval)
+        self._restoring: Dict[str, concurrent.futures.Future] = {}
+        self._usage: Dict[str, int] = {}
+
+        game_store.on_evict(self.discard)
+
+    def start(self) -> None:
+        """Start the periodic sweep, if it isn't running yet."""
+        self._sweeps.keep()
+
+    def discard(self, game_id: str) -> None:
+        """Forget everything derived from a game the store dropped."""
+        self.evicted += 1
+        question_cache.discard(game_id)
+        qr_codes.discard(game_id)
+        query_cache.invalidate(f'trivia-game-{game_id}')
+
+    def stats(self) -> dict:
+        usage = self._usage
+        return {"games": len(usage), "bytes": sum(usage.values()), "evicted": self.evicted}
+
+    async def restore(self, game_id: str) -> dict:
+        """The game, rebuilt from its workflow if the store lost it.
+
+        Raises GameNotFound if the workflow doesn't exist either.
+        """
+        with self._lock:
+            pending = self._restoring.get(game_id)
+            if pending is None:
+                pending = self._restoring[game_id] = background.submit(self._restore(game_id))
+                pending.add_done_callback(lambda _: self._restoring.pop(game_id, None))
+        return await asyncio.shield(asyncio.wrap_future(pending))
+
+    async def _sweep(self) -> None:
+        loop = asyncio.get_running_loop()
+        evicted = await loop.run_in_executor(None, game_store.sweep)
+        self._usage = await loop.run_in_executor(None, game_store.usage)
+        if evicted:
+            print(f"Evicted {len(evicted)} idle game(s), {len(self._usage)} left")
+
+    async def _restore(self, game_id: str) -> dict:
+        game = await game_store.get_async(game_id)
+        if game is not None:
+            return game
+
+        started = time.perf_counter()
+        client = await get_client()
+        handle = client.get_workflow_handle(f'trivia-game-{game_id}')
+        state = await query_state(handle)
+        players, progress = state["players"], state["progress"]
+
+        # Limits aren't queryable, they come from the workflow's input.
+        params = None
+        created_at = time.time()
+        async for event in handle.fetch_history_events(page_size=1):
+            (params,) = await client.data_converter.decode(
+                event.workflow_execution_started_event_attributes.input.payloads,
+                [TriviaWorkflowInput],
+            )
+            created_at = event.event_time.ToSeconds()
+            break
+
+        game = {
+            "users": list(players),
+            "number_players": params.NumberOfPlayers if params else len(players),
+            "started": progress["stage"] != "start",
+            "answer_limit": params.AnswerTimeLimit if params else 300,
+            "created_at": created_at,
+            "joining": {},
+            "rejected": {},
+        }
+        if game["started"]:
+            game["number_questions"] = int(progress["numberOfQuestions"])
+            game["question_number"] = str(progress.get("currentQuestion") or 1)
+
+        await game_store.create_async(game_id, game)
+        metrics.observe("trivia_game_restore_seconds", time.perf_counter() - started)
+        print(f"Restored evicted game {game_id} from its workflow")
+        return await game_store.get_async(game_id) or game
+
+
+metrics.histogram("trivia_game_restore_seconds", "Time to rebuild an evicted game from its workflow.")
+
+game_evictor = GameEvictor(interval=float(os.getenv("GAME_SWEEP_INTERVAL", "30")))
@@ -0,0 +1,243 @@
+from bisect import bisect_left
+from contextvars import ContextVar
+from flask import Flask, before_render_template, g, request, template_rendered
+from temporalio.client import (
+    DescribeWorkflowInput,
+    Interceptor,
+    OutboundInterceptor,
+    QueryWorkflowInput,
+    SignalWorkflowInput,
+    StartWorkflowInput,
+)
+from temporalio.service import RPCError
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+import os
+import threading
+import time
+
+Labels = Tuple[Tuple[str, str], ...]
+
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _labels(labels: Dict[str, str]) -> Labels:
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def _format_labels(labels: Labels, extra: str = "") -> str:
+    parts = [f'{k}="{v}"' for k, v in labels]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+class Metrics:
+    """Counters and histograms rendered in the Prometheus text format.
+
+    Metrics are per worker process. Gauges that are cheaper to read than to
+    keep up to date are added with ``collector`` and computed on scrape.
+    """
+
+    def __init__(self, buckets: Tuple[float, ...] = DEFAULT_BUCKETS) -> None:
+        self.buckets = buckets
+        self._lock = threading.Lock()
+        self._meta: Dict[str, Tuple[str, str]] = {}
+        self._counters: Dict[str, Dict[Labels, float]] = {}
+        self._histograms: Dict[str, Dict[Labels, List[float]]] = {}
+        self._collectors: List[Callable[[], Iterable[Tuple[str, str, str, Dict[str, str], float]]]] = []
+
+    def counter(self, name: str, help: str) -> None:
+        self._meta[name] = ("counter", help)
+        self._counters.setdefault(name, {})
+
+    def histogram(self, name: str, help: str) -> None:
+        self._meta[name] = ("histogram", help)
+        self._histograms.setdefault(name, {})
+
+    def collector(self, fn: Callable[[], Iterable[Tuple[str, str, str, Dict[str, str], float]]]):
+        """Add a function yielding (name, type, help, labels, value) samples."""
+        self._collectors.append(fn)
+        return fn
+
+    def inc(self, metric: str, value: float = 1.0, **labels: str) -> None:
+        key = _labels(labels)
+        with self._lock:
+            series = self._counters[metric]
+            series[key] = series.get(key, 0.0) + value
+
+    def observe(self, metric: str, seconds: float, **labels: str) -> None:
+        key = _labels(labels)
+        with self._lock:
+            series = self._histograms[metric]
+            values = series.get(key)
+            if values is None:
+                # One slot per bucket plus +Inf, then sum.
+                values = series[key] = [0.0] * (len(self.buckets) + 2)
+            values[bisect_left(self.buckets, seconds)] += 1
+            values[-1] += seconds
+
+    def render(self) -> str:
+        lines: List[str] = []
+        with self._lock:
+            counters = {n: dict(s) for n, s in self._counters.items()}
+            histograms = {n: {k: list(v) for k, v in s.items()} for n, s in self._histograms.items()}
+
+        for name, series in counters.items():
+            kind, help = self._meta[name]
+            lines += [f"# HELP {name} {help}", f"# TYPE {name} {kind}"]
+            for labels, value in series.items():
+                lines.append(f"{name}{_format_labels(labels)} {value:g}")
+
+        for name, series in histograms.items():
+            kind, help = self._meta[name]
+            lines += [f"# HELP {name} {help}", f"# TYPE {name} {kind}"]
+            for labels, values in series.items():
+                cumulative = 0.0
+                for bound, count in zip(self.buckets + (float("inf"),), values):
+                    cumulative += count
+                    le = '"+Inf"' if bound == float("inf") else f'"{bound:g}"'
+                    lines.append(f"{name}_bucket{_format_labels(labels, 'le=' + le)} {cumulative:g}")
+                lines.append(f"{name}_sum{_format_labels(labels)} {values[-1]:g}")
+                lines.append(f"{name}_count{_format_labels(labels)} {cumulative:g}")
+
+        seen = set()
+        for collect in self._collectors:
+            for name, kind, help, labels, value in collect():
+                if name not in seen:
+                    seen.add(name)
+                    lines += [f"# HELP {name} {help}", f"# TYPE {name} {kind}"]
+                lines.append(f"{name}{_format_labels(_labels(labels))} {value:g}")
+
+        return "\n".join(lines) + "\n"
+
+
+class Profiler:
+    """Optional per-request breakdown of where the time went.
+
+    While enabled, every Temporal call, query and template render made on
+    behalf of a request is recorded and requests slower than ``slow_ms`` are
+    logged with their spans. Toggled at runtime with SIGUSR1.
+    """
+
+    def __init__(self, enabled: bool = False, slow_ms: float = 0.0) -> None:
+        self.enabled = enabled
+        self.slow_ms = slow_ms
+        self._trace: ContextVar[Optional["_Trace"]] = ContextVar("trace", default=None)
+
+    def toggle(self, *_) -> None:
+        self.enabled = not self.enabled
+        print(f"Request profiling {'enabled' if self.enabled else 'disabled'} in worker {os.getpid()}")
+
+    def start(self) -> None:
+        self._trace.set(_Trace() if self.enabled else None)
+
+    def span(self, name: str, seconds: float) -> None:
+        trace = self._trace.get()
+        if trace is not None and trace.open:
+            trace.spans.append((name, seconds))
+
+    def finish(self, request_name: str, seconds: float) -> None:
+        trace = self._trace.get()
+        if trace is None:
+            return
+        # Background tasks started during the request (watchers, refreshes)
+        # inherited the trace, stop them from adding to it.
+        trace.open = False
+        self._trace.set(None)
+        if seconds * 1000 < self.slow_ms:
+            return
+        accounted = sum(s for _, s in trace.spans)
+        spans = ", ".join(f"{name} {s * 1000:.1f}ms" for name, s in trace.spans)
+        print(f"PROFILE {request_name} {seconds * 1000:.1f}ms "
+              f"({(seconds - accounted) * 1000:.1f}ms in Flask/app code){': ' + spans if spans else ''}")
+
+
+class _Trace:
+    __slots__ = ("open", "spans")
+
+    def __init__(self) -> None:
+        self.open = True
+        self.spans: List[Tuple[str, float]] = []
+
+
+class MetricsInterceptor(Interceptor):
+    """Times every Temporal call the UI makes, labeled by call, name and outcome."""
+
+    def intercept_client(self, next: OutboundInterceptor) -> OutboundInterceptor:
+        return _MetricsOutboundInterceptor(next)
+
+
+class _MetricsOutboundInterceptor(OutboundInterceptor):
+    async def _timed(self, call: str, name: str, coro):
+        started = time.perf_counter()
+        outcome = "ok"
+        try:
+            return await coro
+        except RPCError as e:
+            outcome = e.status.name.lower()
+            raise
+        except BaseException as e:
+            outcome = type(e).__name__
+            raise
+        finally:
+            elapsed = time.perf_counter() - started
+            metrics.observe("trivia_temporal_call_seconds", elapsed, call=call, name=name, outcome=outcome)
+            profiler.span(f"{call} {name}", elapsed)
+
+    async def start_workflow(self, input: StartWorkflowInput):
+        return await self._timed("start_workflow", input.workflow, super().start_workflow(input))
+
+    async def query_workflow(self, input: QueryWorkflowInput):
+        return await self._timed("query", input.query, super().query_workflow(input))
+
+    async def signal_workflow(self, input: SignalWorkflowInput) -> None:
+        return await self._timed("signal", input.signal, super().signal_workflow(input))
+
+    async def describe_workflow(self, input: DescribeWorkflowInput):
+        # Game ids would make a series per game.
+        return await self._timed("describe", input.id.rstrip("0123456789"), super().describe_workflow(input))
+
+
+def instrument(app: Flask) -> None:
+    """Time every request and template render of ``app``."""
+    rendering = threading.local()
+
+    @app.before_request
+    def start_request_timer():
+        g.request_started = time.perf_counter()
+        profiler.start()
+
+    @app.after_request
+    def record_request(response):
+        started = g.pop("request_started", None)
+        if started is not None:
+            elapsed = time.perf_counter() - started
+            route = request.url_rule.rule if request.url_rule else "unmatched"
+            metrics.inc("trivia_http_requests_total", route=route, method=request.method, status=response.status_code)
+            metrics.observe("trivia_http_request_seconds", elapsed, route=route, method=request.method)
+            profiler.finish(f"{request.method} {request.path}", elapsed)
+        return response
+
+    @before_render_template.connect_via(app)
+    def start_render_timer(sender, template, context, **extra):
+        rendering.started = time.perf_counter()
+
+    @template_rendered.connect_via(app)
+    def record_render(sender, template, context, **extra):
+        elapsed = time.perf_counter() - rendering.started
+        metrics.observe("trivia_template_render_seconds", elapsed, template=template.name)
+        profiler.span(f"render {template.name}", elapsed)
+
+
+metrics = Metrics()
+metrics.counter("trivia_http_requests_total", "HTTP requests by route, method and status.")
+metrics.histogram("trivia_http_request_seconds", "Time to produce a response, by route and method.")
+metrics.histogram("trivia_template_render_seconds", "Template render time.")
+metrics.histogram("trivia_temporal_call_seconds", "Temporal RPCs by call, workflow/query/signal name and outcome.")
+metrics.histogram("trivia_query_seconds", "Workflow queries including cache and retries, by query and outcome.")
+metrics.counter("trivia_query_retries_total", "Query attempts that were retried, by query.")
+
+profiler = Profiler(
+    enabled=os.getenv("PROFILE_REQUESTS") == "1",
+    slow_ms=float(os.getenv("PROFILE_SLOW_MS", "0")),
+)
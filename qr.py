@@ -0,0 +1,55 @@
+from collections import OrderedDict
+from typing import Tuple
+import hashlib
+import os
+import threading
+
+JOIN_URL = os.getenv("JOIN_URL", "https://trivia.tmprl-demo.cloud/{game_id}/join")
+
+
+class QRCodeCache:
+    """Join QR codes rendered as SVG in memory, most recently used kept.
+
+    Codes only depend on the game id, so a rendered code never changes and
+    its ETag is a hash of the bytes.
+    """
+
+    def __init__(self, max_entries: int = 256) -> None:
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._codes: "OrderedDict[str, Tuple[bytes, str]]" = OrderedDict()
+
+    def get(self, game_id: str) -> Tuple[bytes, str]:
+        """Return the SVG bytes and ETag for a game's join code."""
+        with self._lock:
+            code = self._codes.get(game_id)
+            if code is not None:
+                self._codes.move_to_end(game_id)
+                return code
+
+        # Rendering takes a few milliseconds, don't hold the lock for it. Two
+        # requests racing for the same game render identical bytes.
+        svg = self.render(game_id)
+        code = (svg, hashlib.sha256(svg).hexdigest()[:32])
+        with self._lock:
+            self._codes[game_id] = code
+            self._codes.move_to_end(game_id)
+            while len(self._codes) > self.max_entries:
+                self._codes.popitem(last=False)
+        return code
+
+    def discard(self, game_id: str) -> None:
+        with self._lock:
+            self._codes.pop(game_id, None)
+
+    @staticmethod
+    def render(game_id: str) -> bytes:
+        # Imported on first use, most workers never render a code.
+        import qrcode
+        import qrcode.image.svg
+
+        img = qrcode.make(JOIN_URL.format(game_id=game_id), image_factory=qrcode.image.svg.SvgPathImage)
+        return img.to_string(encoding="utf-8")
+
+
+qr_codes = QRCodeCache(max_entries=int(os.getenv("QR_CACHE_SIZE", "256")))
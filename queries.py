@@ -0,0 +1,283 @@
+from client import pool
+from metrics import metrics
+from temporalio.client import WorkflowHandle, WorkflowQueryFailedError, WorkflowQueryRejectedError
+from temporalio.service import RPCError, RPCStatusCode
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+import asyncio
+import concurrent.futures
+import itertools
+import os
+import random
+import re
+import threading
+import time
+
+
+class GameNotFound(Exception):
+    """The game workflow does not exist (anymore)."""
+
+
+class GameUnavailable(Exception):
+    """The game workflow could not be queried in time."""
+
+
+class QueryCache:
+    """Short-lived cache of workflow query results.
+
+    Results are keyed by (workflow id, query name, argument) and kept for ``ttl``
+    seconds. Concurrent callers asking for the same key while a query is in
+    flight share that query instead of issuing their own. Signals we send
+    should be followed by ``invalidate`` so the next read sees their effect.
+    """
+
+    def __init__(self, ttl: float = 1.0, prune_interval: float = 30.0) -> None:
+        self.ttl = ttl
+        self.prune_interval = prune_interval
+
+        self._lock = threading.Lock()
+        self._entries: Dict[Tuple[str, str, Hashable], Tuple[float, Any]] = {}
+        self._inflight: Dict[Tuple[str, str, Hashable], concurrent.futures.Future] = {}
+        self._invalidated: Dict[str, int] = {}
+        self._running: Dict[str, int] = {}
+        self._epoch = itertools.count(1)
+        self._pruned_at = time.monotonic()
+
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+
+    async def query(self, handle: WorkflowHandle, name: str, arg: Hashable = None) -> Any:
+        key = (handle.id, name, arg)
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > now:
+                self.hits += 1
+                return entry[1]
+
+            pending = self._inflight.get(key)
+            if pending is not None:
+                self.coalesced += 1
+                owner = False
+            else:
+                self.misses += 1
+                pending = concurrent.futures.Future()
+                epoch = next(self._epoch)
+                self._inflight[key] = pending
+                self._running[handle.id] = self._running.get(handle.id, 0) + 1
+                owner = True
+
+            if now - self._pruned_at > self.prune_interval:
+                self._prune(now)
+
+        if not owner:
+            # Shielded so a waiter timing out doesn't cancel the shared query.
+            return await asyncio.shield(asyncio.wrap_future(pending))
+
+        try:
+            result = await (handle.query(name) if arg is None else handle.query(name, arg))
+        except BaseException as e:
+            with self._lock:
+                self._finish(key, pending)
+            if isinstance(e, asyncio.CancelledError):
+                pending.set_exception(RuntimeError(f"Query {name} on {handle.id} was cancelled"))
+            else:
+                pending.set_exception(e)
+            raise
+
+        with self._lock:
+            self._finish(key, pending)
+            # Don't cache a result that may predate a signal sent while the
+            # query was in flight, nor an empty one the caller will retry.
+            if result and self._invalidated.get(handle.id, 0) < epoch:
+                self._entries[key] = (time.monotonic() + self.ttl, result)
+        pending.set_result(result)
+        return result
+
+    def invalidate(self, workflow_id: str) -> None:
+        """Forget cached and in-flight results for a workflow."""
+        with self._lock:
+            self._invalidated[workflow_id] = next(self._epoch)
+            for key in [k for k in self._entries if k[0] == workflow_id]:
+                del self._entries[key]
+            # Callers arriving from now on start a fresh query; the old one
+            # still completes for whoever is already waiting on it.
+            for key in [k for k in self._inflight if k[0] == workflow_id]:
+                del self._inflight[key]
+
+    def stats(self) -> dict:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "entries": len(self._entries),
+        }
+
+    def _finish(self, key: Tuple[str, str, Hashable], pending: concurrent.futures.Future) -> None:
+        if self._inflight.get(key) is pending:
+            del self._inflight[key]
+        running = self._running[key[0]] - 1
+        if running:
+            self._running[key[0]] = running
+        else:
+            del self._running[key[0]]
+
+    def _prune(self, now: float) -> None:
+        for key in [k for k, (expires, _) in self._entries.items() if expires <= now]:
+            del self._entries[key]
+        # Invalidation markers only matter while an older query may still land.
+        for workflow_id in [w for w in self._invalidated if w not in self._running]:
+            del self._invalidated[workflow_id]
+        self._pruned_at = now
+
+
+query_cache = QueryCache(ttl=float(os.getenv("QUERY_CACHE_TTL", "1.0")))
+
+QUERY_ATTEMPTS = int(os.getenv("QUERY_ATTEMPTS", "8"))
+QUERY_DEADLINE = float(os.getenv("QUERY_DEADLINE", "10"))
+QUERY_INITIAL_BACKOFF = 0.1
+QUERY_MAX_BACKOFF = 2.0
+
+async def cached_query(handle: WorkflowHandle, name: str, arg: Hashable = None) -> Any:
+    return await query_cache.query(handle, name, arg)
+
+
+async def query_workflow(
+    handle: WorkflowHandle,
+    name: str,
+    allow_empty: bool = False,
+    attempts: int = QUERY_ATTEMPTS,
+    deadline: float = QUERY_DEADLINE,
+    arg: Hashable = None,
+    complete: Optional[Callable[[Any], bool]] = None,
+) -> Any:
+    """Query a workflow through the cache, retrying transient failures.
+
+    Retries use exponential backoff with full jitter and stop after
+    ``attempts`` tries or ``deadline`` seconds, whichever comes first. Empty
+    results are retried too unless ``allow_empty`` is set; ``complete`` decides
+    what counts as empty when it's more than a falsy result. Raises
+    GameNotFound when the workflow doesn't exist and GameUnavailable when it
+    can't be queried.
+    """
+    started = time.perf_counter()
+    outcome = "ok"
+    try:
+        return await _query_workflow(handle, name, arg, allow_empty, complete or bool, attempts, deadline)
+    except GameNotFound:
+        outcome = "not_found"
+        raise
+    except GameUnavailable as e:
+        outcome = "failed" if isinstance(e.__cause__, (WorkflowQueryFailedError, WorkflowQueryRejectedError)) else "unavailable"
+        raise
+    except BaseException as e:
+        outcome = type(e).__name__
+        raise
+    finally:
+        metrics.observe("trivia_query_seconds", time.perf_counter() - started, query=name, outcome=outcome)
+
+
+async def _query_workflow(
+    handle: WorkflowHandle,
+    name: str,
+    arg: Hashable,
+    allow_empty: bool,
+    complete: Callable[[Any], bool],
+    attempts: int,
+    deadline: float,
+) -> Any:
+    stop_at = time.monotonic() + deadline
+    backoff = QUERY_INITIAL_BACKOFF
+    last_error: Optional[BaseException] = None
+    attempt = 0
+    while attempt < attempts:
+        attempt += 1
+        remaining = stop_at - time.monotonic()
+        try:
+            result = await asyncio.wait_for(cached_query(handle, name, arg), remaining)
+        except asyncio.TimeoutError as e:
+            last_error = e
+            break
+        except RPCError as e:
+            if e.status == RPCStatusCode.NOT_FOUND:
+                raise GameNotFound(f"Game workflow {handle.id} not found") from e
+            last_error = e
+        except (WorkflowQueryFailedError, WorkflowQueryRejectedError) as e:
+            # The workflow answered, retrying won't change its mind.
+            raise GameUnavailable(f"Query {name} on {handle.id} failed: {e}") from e
+        except Exception as e:
+            last_error = e
+        else:
+            if allow_empty or complete(result):
+                if attempt > 1:
+                    print(f"Query {name} on {handle.id} succeeded after {attempt} attempts")
+                return result
+
+        if attempt == attempts:
+            break
+        metrics.inc("trivia_query_retries_total", query=name)
+        delay = min(random.uniform(0, backoff), stop_at - time.monotonic())
+        if delay <= 0:
+            break
+        await asyncio.sleep(delay)
+        backoff = min(backoff * 2, QUERY_MAX_BACKOFF)
+
+    print(f"Giving up on query {name} on {handle.id} after {attempt} attempts: {last_error!r}")
+    if isinstance(last_error, RPCError) and last_error.status == RPCStatusCode.UNAVAILABLE:
+        # The server didn't answer any attempt, the next request reconnects.
+        pool.invalidate()
+    raise GameUnavailable(f"Game workflow {handle.id} is not answering, try again shortly")
+
+
+# How workers without a getState handler answer it: Go, Java and Python SDKs.
+UNKNOWN_QUERY = re.compile(r"unknown query|known ?quer", re.IGNORECASE)
+# How long to use the individual queries after a worker didn't know getState.
+STATE_QUERY_REPROBE = float(os.getenv("STATE_QUERY_REPROBE", "60"))
+
+state_query_unsupported_until = 0.0
+
+
+async def query_state(
+    handle: WorkflowHandle,
+    questions: bool = False,
+    require: Tuple[str, ...] = (),
+    attempts: int = QUERY_ATTEMPTS,
+    deadline: float = QUERY_DEADLINE,
+) -> Dict[str, Any]:
+    """A game's progress, players and, with ``questions``, questions.
+
+    Asks the workflow's ``getState`` query, one round trip for everything.
+    Workers predating it fail the query as unknown; then the individual
+    queries are sent concurrently instead, and keep being used for
+    ``STATE_QUERY_REPROBE`` seconds before ``getState`` is tried again. Parts
+    named in ``require`` are retried while empty, like ``query_workflow``
+    does for a single query without ``allow_empty``.
+    """
+    global state_query_unsupported_until
+
+    parts = ("progress", "players", "questions") if questions else ("progress", "players")
+    if time.monotonic() >= state_query_unsupported_until:
+        try:
+            state = await query_workflow(
+                handle, "getState", arg=questions, attempts=attempts, deadline=deadline,
+                complete=lambda s: bool(s) and s.get("progress") and all(s.get(p) for p in require),
+            )
+        except GameUnavailable as e:
+            if not (isinstance(e.__cause__, WorkflowQueryFailedError) and UNKNOWN_QUERY.search(str(e.__cause__))):
+                raise
+            print(f"Workflow {handle.id} has no getState query, using individual queries for {STATE_QUERY_REPROBE:.0f}s")
+            state_query_unsupported_until = time.monotonic() + STATE_QUERY_REPROBE
+        else:
+            metrics.inc("trivia_state_queries_total", mode="combined")
+            return {part: state.get(part) or {} for part in parts}
+
+    metrics.inc("trivia_state_queries_total", mode="individual")
+    names = {"progress": "getProgress", "players": "getPlayers", "questions": "getQuestions"}
+    results = await asyncio.gather(*(
+        query_workflow(handle, names[part], allow_empty=part not in require and part != "progress", attempts=attempts, deadline=deadline)
+        for part in parts
+    ))
+    return dict(zip(parts, results))
+
+
+metrics.counter("trivia_state_queries_total", "Game state reads, by whether getState answered (combined) or the individual queries did.")
@@ -0,0 +1,127 @@
+from collections import OrderedDict
+from flask import render_template
+from markupsafe import Markup
+from queries import query_state, query_workflow
+from store import game_store
+from temporalio.client import WorkflowHandle
+from typing import Dict, Optional, Tuple
+import os
+import threading
+
+
+class Question:
+    """One question of a game, immutable once loaded."""
+
+    __slots__ = ("number", "text", "choices", "answer", "_fragments")
+
+    def __init__(self, number: int, text: str, choices: Tuple[Tuple[str, str], ...], answer: str) -> None:
+        self.number = number
+        self.text = text
+        # (letter, text) in the order the workflow listed them.
+        self.choices = choices
+        self.answer = answer
+        self._fragments: Dict[str, Markup] = {}
+
+    def letter(self, choice: str) -> Optional[str]:
+        """``choice`` spelled like this question's letter, None if it isn't one."""
+        choice = choice.upper()
+        return next((letter for letter, _ in self.choices if letter.upper() == choice), None)
+
+    def fragment(self, template: str) -> Markup:
+        """Render ``template`` for this question once and reuse the HTML."""
+        html = self._fragments.get(template)
+        if html is None:
+            # Racing renders produce the same HTML, the last one is kept.
+            html = self._fragments[template] = Markup(render_template(template, question=self))
+        return html
+
+
+class GameQuestions:
+    """All questions of a game, indexed by question number (from 1)."""
+
+    __slots__ = ("game_id", "questions")
+
+    def __init__(self, game_id: str, raw: dict) -> None:
+        self.game_id = game_id
+        self.questions = tuple(
+            Question(
+                int(number),
+                q["question"],
+                tuple(q["multipleChoiceAnswers"].items()),
+                q["answer"],
+            )
+            for number, q in sorted(raw.items(), key=lambda item: int(item[0]))
+        )
+
+    def __getitem__(self, number: int) -> Question:
+        # 0 is the workflow's question before the game starts, not the last one.
+        index = int(number) - 1
+        if not 0 <= index < len(self.questions):
+            raise KeyError(f"Game {self.game_id} has no question {number}")
+        return self.questions[index]
+
+    def __len__(self) -> int:
+        return len(self.questions)
+
+
+class QuestionCache:
+    """Questions of recently played games, loaded once per game and process.
+
+    A game's questions come from the game store if another worker already
+    fetched them, otherwise from the workflow (``getState`` when the progress
+    is needed too, else ``getQuestions``), and are then written to the store
+    once.
+    """
+
+    def __init__(self, max_games: int = 1024) -> None:
+        self.max_games = max_games
+        self._lock = threading.Lock()
+        self._games: "OrderedDict[str, GameQuestions]" = OrderedDict()
+
+    async def get(self, handle: WorkflowHandle, game_id: str, allow_empty: bool = False) -> Optional[GameQuestions]:
+        """The game's questions, or None if ``allow_empty`` and there are none yet."""
+        questions = await self.cached(game_id)
+        if questions is None:
+            raw = await query_workflow(handle, "getQuestions", allow_empty=allow_empty)
+            if not raw:
+                return None
+            questions = await self.add(game_id, raw)
+        return questions
+
+    async def get_with_progress(self, handle: WorkflowHandle, game_id: str) -> Tuple[GameQuestions, dict]:
+        """The game's questions and progress, in one query if the questions aren't loaded yet."""
+        questions = await self.cached(game_id)
+        if questions is not None:
+            return questions, await query_workflow(handle, "getProgress")
+        state = await query_state(handle, questions=True, require=("questions",))
+        return await self.add(game_id, state["questions"]), state["progress"]
+
+    async def cached(self, game_id: str) -> Optional[GameQuestions]:
+        """The game's questions if this process or the game store has them."""
+        with self._lock:
+            questions = self._games.get(game_id)
+            if questions is not None:
+                self._games.move_to_end(game_id)
+                return questions
+
+        raw = (await game_store.get_async(game_id) or {}).get("questions")
+        return self._remember(GameQuestions(game_id, raw)) if raw else None
+
+    async def add(self, game_id: str, raw: dict) -> GameQuestions:
+        """Keep questions fetched from the workflow, writing them to the store once."""
+        await game_store.update_async(game_id, lambda g: g.setdefault("questions", raw))
+        return self._remember(GameQuestions(game_id, raw))
+
+    def _remember(self, questions: GameQuestions) -> GameQuestions:
+        with self._lock:
+            self._games[questions.game_id] = questions
+            while len(self._games) > self.max_games:
+                self._games.popitem(last=False)
+        return questions
+
+    def discard(self, game_id: str) -> None:
+        with self._lock:
+            self._games.pop(game_id, None)
+
+
+question_cache = QuestionCache(max_games=int(os.getenv("QUESTION_CACHE_GAMES", "1024")))
@@ -0,0 +1,71 @@
+from background import Refresher
+from client import get_client
+from queries import GameUnavailable, query_cache
+from temporalio.common import WorkflowIDReusePolicy
+from temporalio.exceptions import WorkflowAlreadyStartedError
+from typing import Optional
+import concurrent.futures
+import os
+import time
+
+
+class RegistryWorkflow:
+    """Keeps the singleton registry workflow that lists active games running.
+
+    The workflow is ensured once when first needed and then every
+    ``interval`` seconds on the background loop. Ensuring is just a start
+    with a fixed workflow id: Temporal rejects it while the workflow runs
+    and starts a new run if the old one closed, so racing starts from any
+    number of workers are harmless and no describe is needed. Between checks
+    the workflow is assumed to be running.
+    """
+
+    def __init__(self, workflow_id: str = "trivia-game", workflow: str = "TriviaGamesWorkflow", interval: float = 60.0) -> None:
+        self.workflow_id = workflow_id
+        self.workflow = workflow
+        self.interval = interval
+
+        self._confirmed_at: Optional[float] = None
+        self._checks = Refresher(
+            self._ensure, f"ensure the {workflow_id} workflow is running", interval=lambda: self.interval,
+        )
+
+    def start(self) -> None:
+        """Start the periodic check, if it isn't running yet."""
+        self._checks.keep()
+
+    async def ensure(self) -> None:
+        """Return once the workflow is known to be running."""
+        self.start()
+        if self._confirmed_at is not None:
+            return
+        try:
+            await self._checks.wait()
+        except Exception as e:
+            raise GameUnavailable("Trivia games are not available right now, try again shortly") from e
+
+    def invalidate(self) -> None:
+        """Forget that the workflow is running, e.g. after it wasn't found."""
+        self._confirmed_at = None
+
+    def refresh(self) -> concurrent.futures.Future:
+        """Ensure the workflow on the background loop, or join the running check."""
+        return self._checks.refresh()
+
+    async def _ensure(self) -> None:
+        client = await get_client()
+        try:
+            await client.start_workflow(
+                self.workflow,
+                id=self.workflow_id,
+                task_queue=os.getenv("TEMPORAL_TASK_QUEUE"),
+                id_reuse_policy=WorkflowIDReusePolicy.ALLOW_DUPLICATE,
+            )
+            print(f"Started the {self.workflow_id} workflow")
+            query_cache.invalidate(self.workflow_id)
+        except WorkflowAlreadyStartedError:
+            pass
+        self._confirmed_at = time.monotonic()
+
+
+game_registry = RegistryWorkflow(interval=float(os.getenv("REGISTRY_CHECK_INTERVAL", "60")))
@@ -0,0 +1,97 @@
+from collections import OrderedDict
+from flask import Flask, Response, render_template, request
+from jinja2 import FileSystemBytecodeCache
+from typing import Any, Hashable, Optional
+import hashlib
+import json
+import os
+import threading
+import time
+
+# Like Flask's JSON in production: compact, sorted keys.
+json_encode = json.JSONEncoder(separators=(",", ":"), sort_keys=True).encode
+
+
+def etag_of(body: bytes) -> str:
+    return hashlib.blake2b(body, digest_size=8).hexdigest()
+
+
+def conditional(body: bytes, mimetype: str, etag: str, cache_control: str = "no-cache") -> Response:
+    """``body`` with its ETag, or an empty 304 if the client already has it."""
+    if etag in request.if_none_match:
+        response = Response(status=304)
+    else:
+        response = Response(body, mimetype=mimetype)
+    response.set_etag(etag)
+    # Browsers keep the response but ask before reusing it.
+    response.headers["Cache-Control"] = cache_control
+    return response
+
+
+def json_response(value: Any) -> Response:
+    """Like ``jsonify`` for poll endpoints, with an ETag of the content."""
+    body = json_encode(value).encode()
+    return conditional(body, "application/json", etag_of(body))
+
+
+class Rendering:
+    """Templates compiled once per worker, and pages rendered once per content.
+
+    ``init_app`` compiles every template at startup instead of on its first
+    request. Compiled templates are also written to a bytecode cache
+    (``TEMPLATE_CACHE_DIR``, by default a per-user directory in the temp
+    dir) that workers started later load instead of compiling again.
+
+    ``page`` renders a template for pages refreshed often: the HTML is kept
+    by ``key``, which must capture everything the page shows, so unchanged
+    refreshes skip Jinja and browsers holding the page get a 304.
+    """
+
+    def __init__(self, cache_dir: Optional[str] = None, max_pages: int = 1024) -> None:
+        self.cache_dir = cache_dir
+        self.max_pages = max_pages
+        # Changes with the templates and assets, so stale ETags don't match.
+        self.build = ""
+
+        self._lock = threading.Lock()
+        self._pages: "OrderedDict[str, bytes]" = OrderedDict()
+
+    def init_app(self, app: Flask, assets_version: str = "") -> None:
+        started = time.perf_counter()
+        env = app.jinja_env
+        if self.cache_dir:
+            os.makedirs(self.cache_dir, exist_ok=True)
+        env.bytecode_cache = FileSystemBytecodeCache(self.cache_dir)
+        names = env.list_templates(extensions=["html"])
+        digest = hashlib.blake2b(assets_version.encode(), digest_size=8)
+        for name in names:
+            source, _, _ = env.loader.get_source(env, name)
+            digest.update(source.encode())
+            env.get_template(name)
+        self.build = digest.hexdigest()
+        print(f"Compiled {len(names)} templates in {(time.perf_counter() - started) * 1000:.0f} ms")
+
+    def page(self, template: str, key: Hashable, **context) -> Response:
+        etag = hashlib.blake2b(repr((self.build, template, key)).encode(), digest_size=8).hexdigest()
+        # Pages show the player's name, so they're for this browser only.
+        cache_control = "private, no-cache"
+        if etag in request.if_none_match:
+            return conditional(b"", "text/html", etag, cache_control)
+
+        with self._lock:
+            body = self._pages.get(etag)
+            if body is not None:
+                self._pages.move_to_end(etag)
+        if body is None:
+            body = render_template(template, **context).encode()
+            with self._lock:
+                self._pages[etag] = body
+                while len(self._pages) > self.max_pages:
+                    self._pages.popitem(last=False)
+        return conditional(body, "text/html; charset=utf-8", etag, cache_control)
+
+
+rendering = Rendering(
+    cache_dir=os.getenv("TEMPLATE_CACHE_DIR") or None,
+    max_pages=int(os.getenv("PAGE_CACHE_SIZE", "1024")),
+)
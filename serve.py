@@ -0,0 +1,122 @@
+"""Production entry point for the Trivia UI.
+
+Serves the Flask app with Hypercorn in ``UI_WORKERS`` processes sharing one
+listening socket (one per CPU when a shared GAME_STORE_URL is set, otherwise
+one). Each worker runs its async views on a single shared event
+loop (see TriviaFlask.async_to_sync) and handles requests on a pool of
+``UI_THREADS`` threads. Game event streams and long polls are served on the
+server's event loop instead (see streams.py), so they don't take a thread. On SIGTERM/SIGINT workers stop accepting connections,
+end open event streams and give in-flight requests ``UI_GRACEFUL_TIMEOUT``
+seconds to finish.
+
+    $ UI_WORKERS=4 poetry run python serve.py
+"""
+from concurrent.futures import ThreadPoolExecutor
+from multiprocessing.connection import wait
+import asyncio
+import multiprocessing
+import os
+import signal
+import socket
+import sys
+
+HOST = os.getenv("UI_HOST", "0.0.0.0")
+PORT = int(os.getenv("UI_PORT", "5000"))
+# Game metadata is per process with the memory store, more than one worker
+# needs a shared GAME_STORE_URL.
+SHARED_STORE = not os.getenv("GAME_STORE_URL", "memory://").startswith("memory")
+WORKERS = int(os.getenv("UI_WORKERS", str(os.cpu_count() or 1) if SHARED_STORE else "1"))
+THREADS = int(os.getenv("UI_THREADS", "64"))
+GRACEFUL_TIMEOUT = float(os.getenv("UI_GRACEFUL_TIMEOUT", "20"))
+
+
+def serve_worker(fd: int) -> None:
+    # Imported here so nothing (threads, connections) is created before fork.
+    from hypercorn.asyncio.run import worker_serve
+    from hypercorn.config import Config
+    from answer_queue import answer_queue
+    from app import app
+    from events import game_events
+    from metrics import profiler
+    from streams import StreamingApp
+
+    config = Config()
+    config.bind = [f"fd://{fd}"]
+    config.graceful_timeout = GRACEFUL_TIMEOUT
+    if os.getenv("UI_ACCESS_LOG") == "1":
+        config.accesslog = "-"
+
+    async def main() -> None:
+        loop = asyncio.get_running_loop()
+        # WSGI requests run in the loop's default executor.
+        loop.set_default_executor(ThreadPoolExecutor(THREADS, thread_name_prefix="trivia-request"))
+
+        stop = asyncio.Event()
+        for sig in (signal.SIGTERM, signal.SIGINT):
+            loop.add_signal_handler(sig, stop.set)
+        loop.add_signal_handler(signal.SIGUSR1, profiler.toggle)
+
+        async def shutdown_trigger() -> None:
+            await stop.wait()
+            print(f"Worker {os.getpid()} shutting down, closing event streams...")
+            game_events.close()
+            # Answers were acknowledged already, get them to the workflows.
+            if not await loop.run_in_executor(None, answer_queue.flush, GRACEFUL_TIMEOUT):
+                print(f"Worker {os.getpid()} exiting with {answer_queue.stats()['queued']} answer(s) not signalled")
+
+        # What hypercorn.asyncio.serve does with mode="wsgi", with our wrapper.
+        await worker_serve(StreamingApp(app, config.wsgi_max_body_size), config, shutdown_trigger=shutdown_trigger)
+
+    asyncio.run(main())
+
+
+def main() -> int:
+    sock = socket.create_server((HOST, PORT), backlog=1024)
+    sock.set_inheritable(True)
+    print(f"Serving Trivia UI on {HOST}:{PORT} with {WORKERS} worker(s), {THREADS} threads each")
+    if WORKERS > 1 and not SHARED_STORE:
+        print("Warning: workers don't share games with the memory game store, set GAME_STORE_URL")
+
+    if WORKERS <= 1:
+        serve_worker(sock.fileno())
+        return 0
+
+    ctx = multiprocessing.get_context("fork")
+    workers = [
+        ctx.Process(target=serve_worker, args=(sock.fileno(),), name=f"trivia-ui-{i}")
+        for i in range(WORKERS)
+    ]
+    for worker in workers:
+        worker.start()
+
+    stopping = False
+
+    def stop(*_) -> None:
+        nonlocal stopping
+        stopping = True
+        for worker in workers:
+            if worker.is_alive():
+                os.kill(worker.pid, signal.SIGTERM)
+
+    def forward(sig, _) -> None:
+        for worker in workers:
+            if worker.is_alive():
+                os.kill(worker.pid, sig)
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+    # SIGUSR1 toggles request profiling in every worker.
+    signal.signal(signal.SIGUSR1, forward)
+
+    # A worker exiting on its own takes the others down with it, the
+    # orchestrator restarts the pod.
+    wait([worker.sentinel for worker in workers])
+    if not stopping:
+        stop()
+    for worker in workers:
+        worker.join()
+    return 0 if stopping else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
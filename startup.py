@@ -0,0 +1,107 @@
+from typing import Dict, List, Optional, Tuple
+import importlib.abc
+import os
+import sys
+import time
+
+
+class _TimedLoader(importlib.abc.Loader):
+    """Wraps a module's loader to time executing the module."""
+
+    def __init__(self, loader, profile: "StartupProfile") -> None:
+        self._loader = loader
+        self._profile = profile
+
+    def create_module(self, spec):
+        return self._loader.create_module(spec)
+
+    def exec_module(self, module) -> None:
+        self._profile._enter()
+        try:
+            self._loader.exec_module(module)
+        finally:
+            self._profile._exit(module.__name__)
+
+    def __getattr__(self, name):
+        # get_data, get_resource_reader, is_package... are the real loader's.
+        return getattr(self._loader, name)
+
+
+class _TimingFinder(importlib.abc.MetaPathFinder):
+    def __init__(self, profile: "StartupProfile") -> None:
+        self._profile = profile
+
+    def find_spec(self, fullname, path, target=None):
+        for finder in sys.meta_path:
+            if finder is self or not hasattr(finder, "find_spec"):
+                continue
+            spec = finder.find_spec(fullname, path, target)
+            if spec is not None:
+                if spec.loader is not None and hasattr(spec.loader, "exec_module"):
+                    spec.loader = _TimedLoader(spec.loader, self._profile)
+                return spec
+        return None
+
+
+class StartupProfile:
+    """Reports where a worker's startup time goes, with PROFILE_STARTUP=1.
+
+    Once ``begin`` is called every module imported afterwards is timed, both
+    including (total) and excluding (self) the modules it imports in turn.
+    Executing a module includes its initialization, e.g. creating the
+    singletons at its bottom. ``report`` prints the slowest modules and
+    ``first_request`` how long it took until the first request was served.
+    """
+
+    def __init__(self, enabled: bool = False, top: int = 25) -> None:
+        self.enabled = enabled
+        self.top = top
+        self.started_at: Optional[float] = None
+        self.served = False
+
+        self._finder: Optional[_TimingFinder] = None
+        # Time spent in modules imported by the module being executed.
+        self._children: List[float] = []
+        self._starts: List[float] = []
+        self._modules: Dict[str, Tuple[float, float]] = {}
+
+    def begin(self) -> None:
+        if not self.enabled or self._finder is not None:
+            return
+        self.started_at = time.perf_counter()
+        self._finder = _TimingFinder(self)
+        sys.meta_path.insert(0, self._finder)
+
+    def report(self, label: str) -> None:
+        """Stop timing imports and print the slowest modules."""
+        if self._finder is None:
+            return
+        sys.meta_path.remove(self._finder)
+        self._finder = None
+
+        elapsed = (time.perf_counter() - self.started_at) * 1000
+        slowest = sorted(self._modules.items(), key=lambda item: -item[1][1])[:self.top]
+        print(f"Startup: {label} after {elapsed:.0f} ms, {len(self._modules)} modules imported")
+        print(f"  {'module':<40}{'total ms':>10}{'self ms':>10}")
+        for name, (total, own) in slowest:
+            print(f"  {name:<40}{total * 1000:>10.1f}{own * 1000:>10.1f}")
+
+    def first_request(self) -> None:
+        if not self.enabled or self.served:
+            return
+        self.served = True
+        print(f"Startup: first request served {(time.perf_counter() - self.started_at) * 1000:.0f} ms after start")
+
+    def _enter(self) -> None:
+        self._starts.append(time.perf_counter())
+        self._children.append(0.0)
+
+    def _exit(self, name: str) -> None:
+        total = time.perf_counter() - self._starts.pop()
+        children = self._children.pop()
+        if self._children:
+            self._children[-1] += total
+        self._modules[name] = (total, total - children)
+
+
+startup_profile = StartupProfile(enabled=os.getenv("PROFILE_STARTUP") == "1")
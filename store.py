@@ -0,0 +1,276 @@
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional, Tuple
+from urllib.parse import urlparse
+import asyncio
+import json
+import os
+import threading
+import time
+
+
+class GameStore:
+    """Where the UI keeps per-game metadata (players, limits, questions, answers).
+
+    Games are plain JSON-compatible dicts. Dicts returned by ``get`` must be
+    treated as read-only, changes go through ``update`` which applies them
+    atomically. Every write pushes the game's expiry ``ttl`` seconds out, so
+    abandoned games disappear on their own. Functions registered with
+    ``on_evict`` learn about games the store dropped by itself.
+
+    Coroutines use the ``*_async`` methods: stores that go over the network
+    (``blocking``) run the call in the loop's executor so a slow round trip
+    doesn't stall the loop, the others answer inline.
+    """
+
+    blocking = False
+
+    def __init__(self, ttl: float) -> None:
+        self.ttl = ttl
+        self._evict_listeners: List[Callable[[str], None]] = []
+
+    def create(self, game_id: str, game: dict) -> bool:
+        """Store a new game, returns False if the id is already taken."""
+        raise NotImplementedError
+
+    def get(self, game_id: str) -> Optional[dict]:
+        raise NotImplementedError
+
+    def update(self, game_id: str, fn: Callable[[dict], None]) -> Optional[dict]:
+        """Apply ``fn`` to the game in place and store the result.
+
+        ``fn`` may be called more than once if the game changed concurrently.
+        Returns the updated game or None if it doesn't exist.
+        """
+        raise NotImplementedError
+
+    def delete(self, game_id: str) -> None:
+        raise NotImplementedError
+
+    def ids(self) -> List[str]:
+        raise NotImplementedError
+
+    async def create_async(self, game_id: str, game: dict) -> bool:
+        return await self._call(self.create, game_id, game)
+
+    async def get_async(self, game_id: str) -> Optional[dict]:
+        return await self._call(self.get, game_id)
+
+    async def update_async(self, game_id: str, fn: Callable[[dict], None]) -> Optional[dict]:
+        return await self._call(self.update, game_id, fn)
+
+    async def delete_async(self, game_id: str) -> None:
+        return await self._call(self.delete, game_id)
+
+    async def _call(self, method, *args):
+        if not self.blocking:
+            return method(*args)
+        return await asyncio.get_running_loop().run_in_executor(None, method, *args)
+
+    def on_evict(self, fn: Callable[[str], None]) -> Callable[[str], None]:
+        self._evict_listeners.append(fn)
+        return fn
+
+    def sweep(self) -> List[str]:
+        """Drop expired games and games over the store's limits, returns their ids."""
+        return []
+
+    def usage(self) -> Dict[str, int]:
+        """Serialized size in bytes of every stored game."""
+        raise NotImplementedError
+
+    def _evicted(self, game_ids: List[str]) -> None:
+        for game_id in game_ids:
+            for fn in self._evict_listeners:
+                try:
+                    fn(game_id)
+                except Exception as e:
+                    print(f"Failed to clean up evicted game {game_id}: {e}")
+
+
+class MemoryGameStore(GameStore):
+    """Per-process store, the default for a single UI worker.
+
+    Reads count as activity too, a game expires ``ttl`` seconds after it was
+    last used. Beyond ``max_games`` games or ``max_bytes`` of serialized
+    state the least recently used games are evicted.
+    """
+
+    def __init__(self, ttl: float, max_games: int = 0, max_bytes: int = 0) -> None:
+        super().__init__(ttl)
+        self.max_games = max_games
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        # game_id -> (expires, size, game), least recently used first.
+        self._games: "OrderedDict[str, Tuple[float, int, dict]]" = OrderedDict()
+        self._bytes = 0
+
+    def create(self, game_id: str, game: dict) -> bool:
+        with self._lock:
+            if self._live(game_id) is not None:
+                return False
+            # An expired game with the same id is replaced, its caches must go.
+            evicted = [game_id] if game_id in self._games else []
+            self._put(game_id, game)
+            evicted += self._trim()
+        self._evicted(evicted)
+        return True
+
+    def get(self, game_id: str) -> Optional[dict]:
+        with self._lock:
+            game = self._live(game_id)
+            if game is not None:
+                _, size, _ = self._games[game_id]
+                self._games[game_id] = (time.monotonic() + self.ttl, size, game)
+                self._games.move_to_end(game_id)
+            return game
+
+    def update(self, game_id: str, fn: Callable[[dict], None]) -> Optional[dict]:
+        with self._lock:
+            game = self._live(game_id)
+            if game is None:
+                return None
+            fn(game)
+            self._put(game_id, game)
+            evicted = self._trim()
+        self._evicted(evicted)
+        return game
+
+    def delete(self, game_id: str) -> None:
+        with self._lock:
+            self._drop(game_id)
+
+    def ids(self) -> List[str]:
+        with self._lock:
+            now = time.monotonic()
+            return [g for g, (expires, _, _) in self._games.items() if expires > now]
+
+    def sweep(self) -> List[str]:
+        with self._lock:
+            now = time.monotonic()
+            evicted = [g for g, (expires, _, _) in self._games.items() if expires <= now]
+            for game_id in evicted:
+                self._drop(game_id)
+            evicted += self._trim()
+        self._evicted(evicted)
+        return evicted
+
+    def usage(self) -> Dict[str, int]:
+        with self._lock:
+            return {game_id: size for game_id, (_, size, _) in self._games.items()}
+
+    def _put(self, game_id: str, game: dict) -> None:
+        self._drop(game_id)
+        size = len(json.dumps(game))
+        self._games[game_id] = (time.monotonic() + self.ttl, size, game)
+        self._bytes += size
+
+    def _drop(self, game_id: str) -> None:
+        entry = self._games.pop(game_id, None)
+        if entry is not None:
+            self._bytes -= entry[1]
+
+    def _trim(self) -> List[str]:
+        # The most recently used game is always kept, however big it is.
+        evicted = []
+        while len(self._games) > 1 and (
+            (self.max_games and len(self._games) > self.max_games)
+            or (self.max_bytes and self._bytes > self.max_bytes)
+        ):
+            game_id = next(iter(self._games))
+            self._drop(game_id)
+            evicted.append(game_id)
+        return evicted
+
+    def _live(self, game_id: str) -> Optional[dict]:
+        entry = self._games.get(game_id)
+        if entry is None or entry[0] <= time.monotonic():
+            # Expired games are left for sweep() so their caches go too.
+            return None
+        return entry[2]
+
+
+class RedisGameStore(GameStore):
+    """Store shared by all UI replicas, backed by Redis or anything speaking its protocol.
+
+    ``redis`` is a redis-py compatible client (``redis.Redis``, or
+    ``fakeredis.FakeRedis`` for a local stand-in). Updates use WATCH/MULTI so
+    concurrent writers from different workers never lose each other's changes.
+    Expiry is left to Redis, and limits to its ``maxmemory`` policy.
+    """
+
+    blocking = True
+
+    def __init__(self, redis, ttl: float, prefix: str = "trivia:game:") -> None:
+        super().__init__(ttl)
+        self.redis = redis
+        self.prefix = prefix
+
+    def create(self, game_id: str, game: dict) -> bool:
+        return bool(self.redis.set(self._key(game_id), json.dumps(game), ex=int(self.ttl), nx=True))
+
+    def get(self, game_id: str) -> Optional[dict]:
+        raw = self.redis.get(self._key(game_id))
+        return None if raw is None else json.loads(raw)
+
+    def update(self, game_id: str, fn: Callable[[dict], None]) -> Optional[dict]:
+        from redis.exceptions import WatchError
+
+        key = self._key(game_id)
+        with self.redis.pipeline() as pipe:
+            while True:
+                try:
+                    pipe.watch(key)
+                    raw = pipe.get(key)
+                    if raw is None:
+                        pipe.reset()
+                        return None
+                    game = json.loads(raw)
+                    fn(game)
+                    pipe.multi()
+                    pipe.set(key, json.dumps(game), ex=int(self.ttl))
+                    pipe.execute()
+                    return game
+                except WatchError:
+                    continue
+
+    def delete(self, game_id: str) -> None:
+        self.redis.delete(self._key(game_id))
+
+    def ids(self) -> List[str]:
+        ids = []
+        for key in self.redis.scan_iter(match=f"{self.prefix}*"):
+            if isinstance(key, bytes):
+                key = key.decode()
+            ids.append(key[len(self.prefix):])
+        return ids
+
+    def usage(self) -> Dict[str, int]:
+        ids = self.ids()
+        with self.redis.pipeline(transaction=False) as pipe:
+            for game_id in ids:
+                pipe.strlen(self._key(game_id))
+            return dict(zip(ids, pipe.execute()))
+
+    def _key(self, game_id: str) -> str:
+        return f"{self.prefix}{game_id}"
+
+
+def create_store(url: str, ttl: float, max_games: int = 0, max_bytes: int = 0) -> GameStore:
+    """Build a store from a URL, ``memory://`` or ``redis://host:port/db``."""
+    scheme = urlparse(url).scheme
+    if scheme in ("", "memory"):
+        return MemoryGameStore(ttl, max_games, max_bytes)
+    if scheme in ("redis", "rediss", "unix"):
+        # Only needed when running more than one worker/replica.
+        import redis
+
+        return RedisGameStore(redis.Redis.from_url(url), ttl)
+    raise ValueError(f"Unsupported GAME_STORE_URL scheme {scheme!r}")
+
+
+game_store = create_store(
+    os.getenv("GAME_STORE_URL", "memory://"),
+    ttl=float(os.getenv("GAME_TTL", str(4 * 60 * 60))),
+    max_games=int(os.getenv("GAME_STORE_MAX_GAMES", "10000")),
+    max_bytes=int(os.getenv("GAME_STORE_MAX_BYTES", str(256 * 1024 * 1024))),
+)
@@ -0,0 +1,93 @@
+from events import LONG_POLL_TIMEOUT, game_events
+from hypercorn.app_wrappers import WSGIWrapper
+from metrics import metrics
+from rendering import json_encode
+from contextlib import aclosing
+from urllib.parse import parse_qs
+import asyncio
+import re
+import time
+
+STREAMED = re.compile(r"^/([^/]+)/(events|state)$")
+
+
+def _arg(query: dict, name: str, default, type):
+    try:
+        return type(query[name][0])
+    except (KeyError, ValueError):
+        return default
+
+
+class StreamingApp(WSGIWrapper):
+    """Hypercorn's WSGI wrapper, with game event streams served on the loop.
+
+    The WSGI app runs in a thread per request, and Hypercorn never tells it
+    that a client went away, so an event stream or a long poll whose browser
+    navigated away would keep its thread busy until it times out.
+    ``/<game_id>/events`` and ``/<game_id>/state`` are answered here instead,
+    as coroutines on the server's event loop that stop as soon as the client
+    disconnects. Everything else goes to the Flask app as before.
+    """
+
+    async def handle_http(self, scope, receive, send, sync_spawn, call_soon) -> None:
+        path = scope["path"][len(scope.get("root_path", "")):]
+        match = STREAMED.match(path) if scope["method"] == "GET" else None
+        if match is None:
+            return await super().handle_http(scope, receive, send, sync_spawn, call_soon)
+
+        game_id, kind = match.groups()
+        query = parse_qs(scope["query_string"].decode("latin-1"))
+        started = time.perf_counter()
+        disconnect = asyncio.ensure_future(self.disconnected(receive))
+        if kind == "events":
+            respond = self.events(game_id, send, disconnect)
+        else:
+            respond = self.state(game_id, query, send)
+        response = asyncio.ensure_future(respond)
+        try:
+            await asyncio.wait((response, disconnect), return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            # Stops the response if the client left first, a no-op otherwise.
+            # Both are awaited so the stream has unsubscribed when we return.
+            disconnect.cancel()
+            response.cancel()
+            await asyncio.gather(response, disconnect, return_exceptions=True)
+        status = response.result() if not response.cancelled() else 499
+        route = f"/<game_id>/{kind}"
+        metrics.inc("trivia_http_requests_total", route=route, method="GET", status=status)
+        metrics.observe("trivia_http_request_seconds", time.perf_counter() - started, route=route, method="GET")
+
+    @staticmethod
+    async def disconnected(receive) -> None:
+        while (await receive())["type"] != "http.disconnect":
+            pass
+
+    async def events(self, game_id: str, send, disconnect: asyncio.Future) -> int:
+        await send({"type": "http.response.start", "status": 200, "headers": [
+            (b"content-type", b"text/event-stream; charset=utf-8"),
+            (b"cache-control", b"no-cache"),
+            (b"x-accel-buffering", b"no"),
+        ]})
+        async with aclosing(game_events.stream_async(game_id)) as events:
+            async for event in events:
+                if disconnect.done():
+                    return 499
+                await send({"type": "http.response.body", "body": event.encode(), "more_body": True})
+        await send({"type": "http.response.body", "body": b"", "more_body": False})
+        return 200
+
+    async def state(self, game_id: str, query: dict, send) -> int:
+        since = _arg(query, "since", 0, int)
+        timeout = min(max(_arg(query, "timeout", LONG_POLL_TIMEOUT, float), 0), LONG_POLL_TIMEOUT)
+        full, compact = await game_events.snapshot_async(game_id, since, timeout)
+        headers = [(b"content-type", b"application/json"), (b"cache-control", b"no-store")]
+        if full is None:
+            status, body = 503, json_encode({"error": f"State of game {game_id} is not available yet"})
+            headers.append((b"retry-after", b"2"))
+        elif full.get("error"):
+            status, body = 404, json_encode({"error": f"Game {game_id} not found"})
+        else:
+            status, body = 200, compact
+        await send({"type": "http.response.start", "status": status, "headers": headers})
+        await send({"type": "http.response.body", "body": body.encode(), "more_body": False})
+        return status
@@ -0,0 +1,16 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "benchmarks"))
+
+import fake_temporal  # noqa: E402
+
+# One fake Temporal for the whole run, the client pool is per process.
+fake_client = fake_temporal.install(latency=0, question_delay=0)
+
+
+@pytest.fixture
+def fake():
+    return fake_client
@@ -0,0 +1,145 @@
+from typing import Callable, List, Optional
+import asyncio
+import threading
+
+from temporalio.service import RPCError, RPCStatusCode
+
+import answer_queue
+from answer_queue import AnswerQueue
+from answers import question_tally, record_answer
+from store import game_store
+from workflow import AnswerSignal
+
+
+class FakeClient:
+    """Records answer signals; ``fail(answer, attempt)`` may return an error to raise."""
+
+    def __init__(self, fail: Optional[Callable[[AnswerSignal, int], Optional[Exception]]] = None) -> None:
+        self.fail = fail
+        self.attempts: List[AnswerSignal] = []
+        self.signalled: List[AnswerSignal] = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+        # Signals wait for this, so tests can queue more answers first.
+        self.go = threading.Event()
+        self.go.set()
+
+    def get_workflow_handle(self, workflow_id: str):
+        return self
+
+    async def signal(self, name: str, answer: AnswerSignal) -> None:
+        self.attempts.append(answer)
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            await asyncio.get_running_loop().run_in_executor(None, self.go.wait, 5)
+            await asyncio.sleep(0.005)
+            error = self.fail and self.fail(answer, sum(a is answer for a in self.attempts))
+            if error is not None:
+                raise error
+            self.signalled.append(answer)
+        finally:
+            self.in_flight -= 1
+
+
+def install(monkeypatch, client: FakeClient) -> None:
+    async def get_client():
+        return client
+
+    monkeypatch.setattr(answer_queue, "get_client", get_client)
+
+
+def answer(player: str, question: int, choice: str) -> AnswerSignal:
+    return AnswerSignal(action="Answer", player=player, question=question, answer=choice.lower())
+
+
+def answered(game_id: str, player: str, question: int, choice: str) -> AnswerSignal:
+    """Tally ``choice`` like the play view does and return its signal."""
+    game_store.update(game_id, lambda g: record_answer(g, question, "B", player, choice))
+    return answer(player, question, choice)
+
+
+def test_each_players_answers_arrive_in_order(monkeypatch):
+    client = FakeClient()
+    install(monkeypatch, client)
+    queue = AnswerQueue()
+    client.go.clear()
+    for question in range(1, 6):
+        for player in ("alice", "bob", "carol"):
+            queue.submit("100", answer(player, question, "a"))
+    client.go.set()
+
+    assert queue.flush(10)
+    for player in ("alice", "bob", "carol"):
+        assert [a.question for a in client.signalled if a.player == player] == [1, 2, 3, 4, 5]
+    # Players don't wait for each other.
+    assert client.max_in_flight == 3
+    assert queue.stats() == {"games": 0, "queued": 0}
+
+
+def test_undelivered_answer_leaves_the_tally(monkeypatch):
+    install(monkeypatch, FakeClient(fail=lambda a, _: RPCError("gone", RPCStatusCode.NOT_FOUND, b"")))
+    game_store.create("101", {"users": ["alice"]})
+    queue = AnswerQueue()
+    queue.submit("101", answered("101", "alice", 1, "B"))
+
+    assert queue.flush(10)
+    tally = question_tally(game_store.get("101"), 1)
+    assert tally["answers"] == {} and tally["correct"] == 0
+    assert tally["unsent"] == ["alice"]
+
+
+def test_failed_answer_resubmitted_meanwhile_stays(monkeypatch):
+    # The first signal fails, the same answer sent again gets through.
+    client = FakeClient(fail=lambda a, _: RPCError("gone", RPCStatusCode.NOT_FOUND, b"") if a is first else None)
+    install(monkeypatch, client)
+    game_store.create("102", {"users": ["alice"]})
+    queue = AnswerQueue()
+    client.go.clear()
+    first = answered("102", "alice", 1, "B")
+    queue.submit("102", first)
+    queue.submit("102", answered("102", "alice", 1, "B"))
+    client.go.set()
+
+    assert queue.flush(10)
+    tally = question_tally(game_store.get("102"), 1)
+    assert tally["answers"] == {"alice": "B"} and tally["correct"] == 1
+    assert "alice" not in tally.get("unsent", [])
+
+
+def test_transient_failures_are_retried(monkeypatch):
+    client = FakeClient(fail=lambda a, attempt: RPCError("busy", RPCStatusCode.UNAVAILABLE, b"") if attempt < 3 else None)
+    install(monkeypatch, client)
+    game_store.create("103", {"users": ["alice"]})
+    queue = AnswerQueue(initial_backoff=0.01)
+    queue.submit("103", answered("103", "alice", 1, "B"))
+
+    assert queue.flush(10)
+    assert len(client.attempts) == 3 and len(client.signalled) == 1
+    assert question_tally(game_store.get("103"), 1)["correct"] == 1
+
+
+def test_retries_stop_at_the_deadline(monkeypatch):
+    client = FakeClient(fail=lambda a, _: RPCError("down", RPCStatusCode.UNAVAILABLE, b""))
+    install(monkeypatch, client)
+    game_store.create("104", {"users": ["alice"]})
+    queue = AnswerQueue(deadline=0.2, initial_backoff=0.01, max_backoff=0.02)
+    queue.submit("104", answered("104", "alice", 1, "B"))
+
+    assert queue.flush(10)
+    assert len(client.attempts) > 1 and client.signalled == []
+    assert question_tally(game_store.get("104"), 1)["unsent"] == ["alice"]
+
+
+def test_flush_waits_for_queued_answers(monkeypatch):
+    client = FakeClient()
+    install(monkeypatch, client)
+    queue = AnswerQueue()
+    client.go.clear()
+    queue.submit("105", answer("alice", 1, "a"))
+
+    assert not queue.flush(0.1)
+    assert queue.stats()["queued"] == 1
+    client.go.set()
+    assert queue.flush(10)
+    assert len(client.signalled) == 1
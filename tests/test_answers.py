@@ -0,0 +1,50 @@
+from answers import discard_answer, leaders, question_tally, record_answer
+
+
+def test_resubmit_moves_the_player():
+    game = {}
+    record_answer(game, 1, "B", "alice", "B")
+    record_answer(game, 1, "B", "bob", "A")
+    record_answer(game, 1, "B", "alice", "B")  # same answer again: no-op
+
+    tally = question_tally(game, 1)
+    assert tally["correct"] == 1 and tally["fastest"] == ["alice"]
+
+    # Right to wrong and back, never counted twice.
+    record_answer(game, 1, "B", "alice", "C")
+    assert tally["choices"] == {"B": [], "A": ["bob"], "C": ["alice"]}
+    assert tally["correct"] == 0 and tally["fastest"] == []
+
+    record_answer(game, 1, "B", "bob", "B")
+    record_answer(game, 1, "B", "alice", "B")
+    assert tally["answers"] == {"alice": "B", "bob": "B"}
+    assert tally["correct"] == 2 and tally["fastest"] == ["bob", "alice"]
+
+
+def test_questions_are_tallied_apart():
+    game = {}
+    record_answer(game, 1, "A", "alice", "A")
+    record_answer(game, 2, "D", "alice", "C")
+    assert question_tally(game, 1)["correct"] == 1
+    assert question_tally(game, 2)["choices"] == {"C": ["alice"]}
+
+
+def test_leaders_follow_the_workflows_scores():
+    players = {"alice": {"score": 3}, "bob": {"score": 7}, "carol": {}}
+    assert leaders(players) == [("bob", 7), ("alice", 3), ("carol", 0)]
+    assert len(leaders({f"p{i}": {"score": i} for i in range(10)})) == 5
+    assert leaders([]) == []
+
+
+def test_discarded_answer_is_taken_back_unless_answered_again():
+    game = {}
+    record_answer(game, 1, "B", "alice", "B")
+    discard_answer(game, 1, "alice", "b")  # signalled in lower case
+    tally = question_tally(game, 1)
+    assert tally["answers"] == {} and tally["correct"] == 0
+    assert tally["unsent"] == ["alice"] and tally["fastest"] == []
+
+    # A new answer clears the mark; a stale failure doesn't undo it.
+    record_answer(game, 1, "B", "alice", "A")
+    discard_answer(game, 1, "alice", "b")
+    assert tally["answers"] == {"alice": "A"} and tally["unsent"] == []
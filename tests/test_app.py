@@ -0,0 +1,23 @@
+import pytest
+
+import app as app_module
+from store import game_store
+
+FORM = {"player": "host", "mode": "casual", "questions": "3", "players": "2", "category": "random"}
+
+
+@pytest.mark.parametrize("outcome", ["error", "raise"])
+def test_game_is_removed_when_its_creator_cant_join(fake, monkeypatch, outcome):
+    async def begin_join(*args):
+        if outcome == "raise":
+            raise RuntimeError("join failed")
+        return "Player host is already joining this game."
+
+    monkeypatch.setattr(app_module, "begin_join", begin_join)
+    games, stored, terminated = set(fake.games), set(game_store.ids()), fake.calls["terminate"]
+
+    response = app_module.app.test_client().post("/create_game", data=FORM)
+    assert response.status_code == (500 if outcome == "raise" else 200)
+    assert set(fake.games) == games
+    assert set(game_store.ids()) == stored
+    assert fake.calls["terminate"] == terminated + 1
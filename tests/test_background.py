@@ -0,0 +1,38 @@
+import asyncio
+
+from background import Refresher
+
+
+def test_concurrent_refreshes_share_one_run():
+    calls = []
+
+    async def fn():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+
+    refresher = Refresher(fn, "count", interval=lambda: 1)
+    futures = {refresher.refresh() for _ in range(5)}
+    assert len(futures) == 1
+    futures.pop().result(5)
+    assert len(calls) == 1
+
+    async def waiters():
+        await asyncio.gather(*(refresher.wait() for _ in range(5)))
+
+    asyncio.run(waiters())
+    assert len(calls) == 2
+
+
+def test_keep_refreshes_while_active_through_failures():
+    calls = []
+
+    async def fn():
+        calls.append(1)
+        if len(calls) == 1:
+            raise RuntimeError("first one fails")
+
+    refresher = Refresher(fn, "count", interval=lambda: 0, active=lambda: len(calls) < 3)
+    refresher.keep()
+    refresher.keep()  # Already running, not a second loop.
+    refresher._keeper.result(5)
+    assert len(calls) == 3
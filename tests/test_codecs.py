@@ -0,0 +1,92 @@
+from temporalio.api.common.v1 import Payload
+from temporalio.converter import PayloadCodec
+import asyncio
+import json
+import os
+
+import pytest
+
+from encryption_codec import COMPRESSED_ENCODING, ENCRYPTED_ENCODING, CodecChain, CompressionCodec, EncryptionCodec
+
+OLD_KEY = b"0" * 32
+NEW_KEY = b"1" * 32
+
+
+def payload(data: bytes) -> Payload:
+    return Payload(metadata={"encoding": b"json/plain"}, data=data)
+
+
+def questions(count: int = 50) -> Payload:
+    """Big and repetitive, like a game's questions."""
+    return payload(json.dumps({str(i): {"question": f"Question {i}?", "answer": "B"} for i in range(count)}).encode())
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+def test_previous_keys_still_decrypt():
+    old = EncryptionCodec(key_id="old", key=OLD_KEY)
+    new = EncryptionCodec(key_id="new", key=NEW_KEY, previous_keys={"old": OLD_KEY})
+    original = [payload(b'"alice"')]
+
+    from_old = run(old.encode(original))
+    assert run(new.decode(from_old)) == original
+    encoded = run(new.encode(original))
+    assert encoded[0].metadata["encryption-key-id"] == b"new"
+    assert run(new.decode(encoded)) == original
+
+
+def test_unknown_key_id_is_rejected():
+    old = EncryptionCodec(key_id="old", key=OLD_KEY)
+    new = EncryptionCodec(key_id="new", key=NEW_KEY)
+    with pytest.raises(ValueError, match="Unrecognized key ID old"):
+        run(new.decode(run(old.encode([payload(b"1")]))))
+
+
+def test_small_and_incompressible_payloads_pass_through():
+    codec = CompressionCodec(threshold=1024)
+    small, noise, big = payload(b'"alice"'), payload(os.urandom(4096)), questions()
+
+    encoded = run(codec.encode([small, noise, big]))
+    assert encoded[0] == small and encoded[1] == noise
+    assert encoded[2].metadata["encoding"] == COMPRESSED_ENCODING
+    assert encoded[2].ByteSize() < big.ByteSize()
+    assert run(codec.decode(encoded)) == [small, noise, big]
+
+
+def test_big_batches_keep_their_order_across_threads():
+    codec = CodecChain(CompressionCodec(parallel_threshold=1), EncryptionCodec(parallel_threshold=1, max_workers=4))
+    original = [questions(i) for i in range(1, 40)]
+    assert run(codec.decode(run(codec.encode(original)))) == original
+
+
+class Tagging(PayloadCodec):
+    """Records the order codecs run in."""
+
+    def __init__(self, name: str, calls: list) -> None:
+        self.name = name
+        self.calls = calls
+
+    async def encode(self, payloads):
+        self.calls.append(f"encode {self.name}")
+        return list(payloads)
+
+    async def decode(self, payloads):
+        self.calls.append(f"decode {self.name}")
+        return list(payloads)
+
+
+def test_chain_decodes_in_reverse_order():
+    calls = []
+    chain = CodecChain(Tagging("first", calls), Tagging("second", calls))
+    run(chain.decode(run(chain.encode([payload(b"1")]))))
+    assert calls == ["encode first", "encode second", "decode second", "decode first"]
+
+    # Compressed, then encrypted: the outer layer is the encryption.
+    encryption = EncryptionCodec()
+    chain = CodecChain(CompressionCodec(), encryption)
+    encoded = run(chain.encode([questions()]))
+    assert encoded[0].metadata["encoding"] == ENCRYPTED_ENCODING
+    assert run(encryption.decode(encoded))[0].metadata["encoding"] == COMPRESSED_ENCODING
+    assert run(chain.decode(encoded)) == [questions()]
@@ -0,0 +1,112 @@
+from types import SimpleNamespace
+import asyncio
+import time
+
+import queries
+from queries import QueryCache
+
+
+class FakeHandle:
+    """Answers queries with ``result``, held while ``hold`` is set.
+
+    ``held`` has an event per held call, setting it lets that call answer.
+    """
+
+    def __init__(self, result="players") -> None:
+        self.id = "trivia-game-1"
+        self.result = result
+        self.calls = 0
+        self.hold = False
+        self.held = []
+
+    async def query(self, name, arg=None):
+        self.calls += 1
+        result = self.result
+        if self.hold:
+            release = asyncio.Event()
+            self.held.append(release)
+            await release.wait()
+        return result
+
+
+def test_concurrent_queries_share_one_call():
+    async def run():
+        cache, handle = QueryCache(ttl=60), FakeHandle()
+        handle.hold = True
+        waiting = [asyncio.ensure_future(cache.query(handle, "getPlayers")) for _ in range(10)]
+        await asyncio.sleep(0)
+        handle.held[0].set()
+        assert await asyncio.gather(*waiting) == ["players"] * 10
+        assert handle.calls == 1
+        assert cache.stats()["coalesced"] == 9
+
+        # Different arguments are different queries.
+        handle.hold = False
+        await cache.query(handle, "getState", True)
+        assert handle.calls == 2
+
+    asyncio.run(run())
+
+
+def test_results_expire_after_ttl(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(queries, "time", SimpleNamespace(monotonic=lambda: now[0], perf_counter=time.perf_counter))
+
+    async def run():
+        cache, handle = QueryCache(ttl=1), FakeHandle()
+        await cache.query(handle, "getProgress")
+        now[0] += 0.9
+        await cache.query(handle, "getProgress")
+        assert handle.calls == 1
+        now[0] += 0.2
+        await cache.query(handle, "getProgress")
+        assert handle.calls == 2
+
+    asyncio.run(run())
+
+
+def test_empty_results_are_not_cached():
+    async def run():
+        cache, handle = QueryCache(ttl=60), FakeHandle(result={})
+        await cache.query(handle, "getPlayers")
+        await cache.query(handle, "getPlayers")
+        assert handle.calls == 2
+
+    asyncio.run(run())
+
+
+def test_invalidate_during_a_query_keeps_its_result_out():
+    async def run():
+        cache, handle = QueryCache(ttl=60), FakeHandle(result="before")
+        handle.hold = True
+        stale = asyncio.ensure_future(cache.query(handle, "getPlayers"))
+        await asyncio.sleep(0)
+
+        # A signal lands while the query is in flight, callers from now on
+        # don't join it.
+        cache.invalidate(handle.id)
+        handle.result = "after"
+        fresh = asyncio.ensure_future(cache.query(handle, "getPlayers"))
+        await asyncio.sleep(0)
+        assert handle.calls == 2
+
+        # The old query answering last must not replace the fresh result.
+        handle.held[1].set()
+        assert await fresh == "after"
+        handle.held[0].set()
+        assert await stale == "before"
+        assert await cache.query(handle, "getPlayers") == "after"
+        assert handle.calls == 2
+
+    asyncio.run(run())
+
+
+def test_invalidate_drops_cached_results():
+    async def run():
+        cache, handle = QueryCache(ttl=60), FakeHandle()
+        await cache.query(handle, "getPlayers")
+        cache.invalidate(handle.id)
+        await cache.query(handle, "getPlayers")
+        assert handle.calls == 2
+
+    asyncio.run(run())
@@ -0,0 +1,68 @@
+import asyncio
+import threading
+import time
+
+import fakeredis
+
+from store import RedisGameStore
+
+
+def redis_stores(count: int):
+    """Stores of ``count`` workers sharing one fake Redis server."""
+    server = fakeredis.FakeServer()
+    return [RedisGameStore(fakeredis.FakeRedis(server=server), ttl=60) for _ in range(count)]
+
+
+def test_create_get_delete():
+    store, = redis_stores(1)
+    assert store.create("1", {"users": []})
+    assert not store.create("1", {"users": ["taken"]})
+    assert store.get("1") == {"users": []}
+    store.delete("1")
+    assert store.get("1") is None
+    assert store.update("1", lambda g: g.update(users=["x"])) is None
+
+
+def test_concurrent_updates_are_not_lost():
+    stores = redis_stores(4)
+    stores[0].create("1", {"count": 0, "seen": []})
+    per_thread = 25
+
+    def bump(store, name):
+        for i in range(per_thread):
+            def fn(game):
+                # Widen the window between WATCH and EXEC so writers collide.
+                time.sleep(0.001)
+                game["count"] += 1
+                game["seen"].append(f"{name}-{i}")
+            store.update("1", fn)
+
+    threads = [threading.Thread(target=bump, args=(store, n)) for n, store in enumerate(stores)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    game = stores[1].get("1")
+    assert game["count"] == per_thread * len(stores)
+    assert len(set(game["seen"])) == per_thread * len(stores)
+
+
+def test_async_calls_leave_the_loop_free():
+    store, = redis_stores(1)
+    store.create("1", {"users": []})
+    get = store.redis.get
+    released = threading.Event()
+
+    def slow_get(key):
+        # A round trip that only ends once the loop has run something else.
+        assert released.wait(5)
+        return get(key)
+
+    store.redis.get = slow_get
+
+    async def run():
+        asyncio.get_running_loop().call_soon(released.set)
+        return await store.get_async("1")
+
+    assert asyncio.run(run()) == {"users": []}
@@ -0,0 +1,129 @@
+from typing import Callable, List, Tuple
+import asyncio
+import json
+import os
+import socket
+import subprocess
+import sys
+import time
+import urllib.parse
+import urllib.request
+
+import pytest
+
+import fake_temporal
+from events import game_events
+from streams import StreamingApp
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def get(port: int, path: str, timeout: float = 5, **form) -> Tuple[str, str]:
+    data = urllib.parse.urlencode(form).encode() if form else None
+    with urllib.request.urlopen(f"http://127.0.0.1:{port}{path}", data, timeout=timeout) as response:
+        return response.geturl(), response.read().decode()
+
+
+def open_and_drop(port: int, path: str) -> None:
+    """Start a request, read the response's first bytes and go away."""
+    sock = socket.create_connection(("127.0.0.1", port), timeout=5)
+    sock.sendall(f"GET {path} HTTP/1.1\r\nHost: localhost\r\n\r\n".encode())
+    if "/events" in path:
+        assert sock.recv(1024).startswith(b"HTTP/1.1 200")
+    sock.close()
+
+
+@pytest.fixture
+def server():
+    """serve.py against fake games, with two request threads."""
+    port = free_port()
+    env = dict(os.environ, UI_HOST="127.0.0.1", UI_PORT=str(port), UI_WORKERS="1", UI_THREADS="2")
+    process = subprocess.Popen(
+        [sys.executable, "benchmarks/fake_temporal.py", "--production", "--question-delay", "0"],
+        cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        for _ in range(100):
+            try:
+                get(port, "/ready", timeout=1)
+                break
+            except OSError:
+                time.sleep(0.1)
+        else:
+            pytest.fail("server didn't start")
+        yield port
+    finally:
+        process.terminate()
+        process.wait(30)
+
+
+def test_closed_streams_free_their_threads(server):
+    url, _ = get(server, "/create_game", player="host", mode="casual", questions="3", players="2", category="random")
+    game_id = url.split("/")[-2]
+
+    # More than the two threads, each held for good if it leaked.
+    for _ in range(4):
+        open_and_drop(server, f"/{game_id}/events")
+        open_and_drop(server, f"/{game_id}/state?since=1&timeout=30")
+
+    started = time.monotonic()
+    get(server, "/ready")
+    assert time.monotonic() - started < 2
+
+
+def request(path: str, query: str, leave: Callable[[List[dict]], bool]) -> Tuple[List[dict], int]:
+    """GET ``path`` from StreamingApp; the client leaves once ``leave(sent)``.
+
+    Returns what was sent and the game's subscribers once the request is done.
+    """
+    sent: List[dict] = []
+
+    async def run() -> int:
+        requested = False
+
+        async def receive() -> dict:
+            nonlocal requested
+            if not requested:
+                requested = True
+                return {"type": "http.request", "body": b"", "more_body": False}
+            while not leave(sent):
+                await asyncio.sleep(0)
+            return {"type": "http.disconnect"}
+
+        async def send(message: dict) -> None:
+            sent.append(message)
+            await asyncio.sleep(0)  # Like writing to the transport.
+
+        scope = {"type": "http", "method": "GET", "path": path, "query_string": query.encode(), "root_path": ""}
+        await StreamingApp(None, 0).handle_http(scope, receive, send, None, None)
+        # Before asyncio.run cleans up whatever the request left behind.
+        return game_events.stats()["subscribers"]
+
+    return sent, asyncio.run(run())
+
+
+@pytest.fixture
+def game(fake):
+    fake.games["4711"] = fake_temporal.FakeGame("4711", 3, 300, 5, 0)
+
+
+def test_stream_unsubscribes_when_the_client_leaves(game):
+    sent, subscribers = request("/4711/events", "", lambda sent: any(b"id: " in m.get("body", b"") for m in sent))
+    assert sent[0]["status"] == 200
+    assert subscribers == 0
+
+
+def test_long_poll_unsubscribes_when_the_client_leaves(game):
+    sent, _ = request("/4711/state", "", lambda sent: len(sent) == 2)
+    version = json.loads(sent[1]["body"])["version"]
+
+    # Nothing changes, so this one waits until the client leaves.
+    sent, subscribers = request("/4711/state", f"since={version}", lambda sent: game_events.stats()["subscribers"] == 1)
+    assert sent == []
+    assert subscribers == 0
@@ -0,0 +1,67 @@
+from temporalio.api.common.v1 import Payload
+from temporalio.converter import DataConverter
+import json
+
+import pytest
+
+from workflow import (
+    AnswerSignal,
+    GamesWorkflowInput,
+    PlayerWorkflowInput,
+    StartGameSignal,
+    TriviaWorkflowInput,
+    message_converter,
+)
+
+MESSAGES = [
+    AnswerSignal(action="Answer", player="alice", question=3, answer="b"),
+    StartGameSignal(action="StartGame"),
+    PlayerWorkflowInput(GameWorkflowId="trivia-game-123456", Player="bob", NumberOfPlayers=4),
+    TriviaWorkflowInput("123456", 4, 5, 15, 300, 10),
+    TriviaWorkflowInput("123456", 4, 5, 15, 300, 10, Category="history"),
+    GamesWorkflowInput(GameId="123456", State="start", Players=[{"name": "alice"}]),
+]
+
+converter = message_converter.payload_converter
+
+
+def payload(data: dict) -> Payload:
+    return Payload(metadata={"encoding": b"json/plain"}, data=json.dumps(data).encode())
+
+
+@pytest.mark.parametrize("value", MESSAGES, ids=lambda v: type(v).__name__)
+def test_wire_format_matches_the_default_converter(value):
+    ours = converter.to_payloads([value])
+    assert ours == DataConverter.default.payload_converter.to_payloads([value])
+    assert converter.from_payloads(ours, [type(value)]) == [value]
+    assert DataConverter.default.payload_converter.from_payloads(ours, [type(value)]) == [value]
+
+
+def test_fields_added_by_newer_workflows_are_ignored():
+    data = {"action": "Answer", "player": "alice", "question": 3, "answer": "b", "at": 1}
+    assert converter.from_payload(payload(data), AnswerSignal) == MESSAGES[0]
+
+
+@pytest.mark.parametrize("data", [
+    {"action": "Answer", "player": "alice", "question": "3", "answer": "b"},
+    {"action": "Answer", "player": "alice", "question": True, "answer": "b"},
+    {"action": "Answer", "player": "alice", "answer": "b"},
+    {"action": "Answer", "player": "alice bob", "question": 3, "answer": "b"},
+    {"action": "Answer", "player": "alice", "question": 0, "answer": "b"},
+    {"action": "Answer", "player": "alice", "question": 3, "answer": "B!"},
+    {"action": "Start", "player": "alice", "question": 3, "answer": "b"},
+])
+def test_malformed_answers_are_rejected(data):
+    with pytest.raises(ValueError):
+        converter.from_payload(payload(data), AnswerSignal)
+
+
+def test_invalid_messages_cant_be_created():
+    with pytest.raises(ValueError):
+        TriviaWorkflowInput("123456", 0, 5, 15, 300, 10)
+    with pytest.raises(ValueError):
+        TriviaWorkflowInput("123456", 4, 5, 15, 300, 10, Category=7)
+    with pytest.raises(ValueError):
+        PlayerWorkflowInput(GameWorkflowId="trivia-game-1", Player="", NumberOfPlayers=2)
+    with pytest.raises(ValueError):
+        StartGameSignal(action="Stop")
@@ -6,13 +6,58 @@ from datetime import datetime, timedelta
 from temporalio import activity, exceptions
 from typing import Optional, List, Dict
 
-@dataclass
+from temporalio.api.common.v1 import Payload
+from temporalio.converter import (
+    CompositePayloadConverter,
+    DataConverter,
+    DefaultPayloadConverter,
+    JSONPlainPayloadConverter,
+)
+import dataclasses
+import re
+import typing
+
+# Signals and workflow inputs, checked when created so nothing malformed
+# reaches a workflow. Their JSON is the same the default converter writes.
+_PLAYER = re.compile(r"[a-zA-Z0-9]+")
+_ANSWER = re.compile(r"[a-z0-9]{1,8}")
+
+
+def message(cls):
+    """Make ``cls`` a slotted dataclass whose fields are type checked on creation."""
+    cls.__post_init__ = _check
+    cls = dataclass(slots=True)(cls)
+    hints = typing.get_type_hints(cls)
+    checks = []
+    for field in dataclasses.fields(cls):
+        hint = hints[field.name]
+        allowed = tuple(typing.get_args(hint)) if typing.get_origin(hint) is typing.Union else (hint,)
+        allowed = tuple(typing.get_origin(t) or t for t in allowed)
+        checks.append((field.name, allowed))
+    # Sorted, as the default JSON converter writes them.
+    cls._wire_fields = tuple(sorted(f.name for f in dataclasses.fields(cls)))
+    cls._wire_checks = tuple(checks)
+    return cls
+
+
+def _check(self) -> None:
+    for name, allowed in self._wire_checks:
+        value = getattr(self, name)
+        # bool is an int, but never a valid one here.
+        if not isinstance(value, allowed) or (isinstance(value, bool) and bool not in allowed):
+            raise ValueError(f"{type(self).__name__}.{name} must be {' or '.join(t.__name__ for t in allowed)}, got {value!r}")
+    validate = getattr(self, "validate", None)
+    if validate is not None:
+        validate()
+
+
+@message
 class GamesWorkflowInput:
-    GameId: int
+    GameId: str
     State: str
     Players: List[Dict]
 
-@dataclass
+@message
 class TriviaWorkflowInput:
     GameId: str
     NumberOfPlayers: int
@@ -22,19 +67,85 @@ class TriviaWorkflowInput:
     ResultTimeLimit: int
     Category: Optional[str] = None
 
-@dataclass
+    def validate(self) -> None:
+        if min(self.NumberOfPlayers, self.NumberOfQuestions, self.AnswerTimeLimit) < 1:
+            raise ValueError("A game needs at least one player, one question and an answer time limit")
+
+@message
 class PlayerWorkflowInput:
-    GameWorkflowId: int
+    GameWorkflowId: str
     Player: str
     NumberOfPlayers: int
 
-@dataclass
+    def validate(self) -> None:
+        if not _PLAYER.fullmatch(self.Player):
+            raise ValueError(f"Invalid player name {self.Player!r}")
+
+@message
 class StartGameSignal:
     action: str
 
-@dataclass
+    def validate(self) -> None:
+        if self.action != "StartGame":
+            raise ValueError(f"Invalid start game action {self.action!r}")
+
+@message
 class AnswerSignal:
     action: str
     player: str
     question: int
-    answer: str  
\ No newline at end of file
+    answer: str
+
+    def validate(self) -> None:
+        if self.action != "Answer":
+            raise ValueError(f"Invalid answer action {self.action!r}")
+        if not _PLAYER.fullmatch(self.player):
+            raise ValueError(f"Invalid player name {self.player!r}")
+        if self.question < 1:
+            raise ValueError(f"Invalid question number {self.question}")
+        if not _ANSWER.fullmatch(self.answer):
+            raise ValueError(f"Invalid answer {self.answer!r}")
+
+
+MESSAGES = (GamesWorkflowInput, TriviaWorkflowInput, PlayerWorkflowInput, StartGameSignal, AnswerSignal)
+
+
+class MessageJSONConverter(JSONPlainPayloadConverter):
+    """``json/plain`` with a fast path for the message types above.
+
+    Messages skip the generic dataclass walk and type-hint conversion, their
+    dicts are built in the sorted field order precomputed by ``message``.
+    Everything else goes through the default JSON converter.
+    """
+
+    _metadata = {"encoding": b"json/plain"}
+    _encode = json.JSONEncoder(separators=(",", ":")).encode
+
+    def to_payload(self, value) -> Optional[Payload]:
+        if type(value) in MESSAGES:
+            data = self._encode({name: getattr(value, name) for name in value._wire_fields})
+            return Payload(metadata=self._metadata, data=data.encode())
+        return super().to_payload(value)
+
+    def from_payload(self, payload: Payload, type_hint=None):
+        if type_hint in MESSAGES:
+            obj = json.loads(payload.data)
+            try:
+                # Fields a newer workflow added are ignored.
+                return type_hint(**{name: obj[name] for name in type_hint._wire_fields if name in obj})
+            except TypeError as e:
+                raise ValueError(f"Malformed {type_hint.__name__}: {e}") from e
+        return super().from_payload(payload, type_hint)
+
+
+class MessagePayloadConverter(CompositePayloadConverter):
+    """The default payload converter with ``MessageJSONConverter`` for JSON."""
+
+    def __init__(self) -> None:
+        super().__init__(*(
+            MessageJSONConverter() if isinstance(c, JSONPlainPayloadConverter) else c
+            for c in DefaultPayloadConverter.default_encoding_payload_converters
+        ))
+
+
+message_converter = DataConverter(payload_converter_class=MessagePayloadConverter)